@@ -0,0 +1,52 @@
+import os,sys,time,types,logging,contextlib,subprocess
+
+# make the library importable without sourcing etc/env.sh:
+_TOPDIR=os.path.normpath(os.path.dirname(os.path.realpath(__file__))+'/..')
+for x in ['clas12','hps','swif','util']:
+  if _TOPDIR+'/lib/'+x not in sys.path:
+    sys.path.insert(0,_TOPDIR+'/lib/'+x)
+
+_LOGGER=logging.getLogger(__name__)
+
+STUB='''bitfileIndex=%d
+size=%d
+crc32=%x
+md5=%.32x
+volser=%s
+'''
+
+def makeStubTree(topdir,nruns,nfiles,firstRun=5000,tapes=4,suffix=''):
+  # make a synthetic /mss-style tree of EVIO stubs, one directory per run:
+  paths=[]
+  for ii in range(nruns):
+    run=firstRun+ii
+    d='%s/clas_%.6d'%(topdir,run)
+    os.makedirs(d,exist_ok=True)
+    for jj in range(nfiles):
+      path='%s/clas_%.6d.evio.%.5d%s'%(d,run,jj,suffix)
+      index=(ii*nfiles+jj)*7919%(nruns*nfiles)
+      with open(path,'w') as f:
+        f.write(STUB%(index,int(2e9)+jj,index,index,'7%.5d'%(index%tapes)))
+      paths.append(path)
+  return paths
+
+def getBaseline(path,ref=None):
+  # import a library file as it was in a git commit, by default the first:
+  if ref is None:
+    ref=subprocess.check_output(['git','rev-list','--max-parents=0','HEAD'],cwd=_TOPDIR,universal_newlines=True).split().pop()
+  code=subprocess.check_output(['git','show',ref+':'+path],cwd=_TOPDIR,universal_newlines=True)
+  module=types.ModuleType('baseline_'+os.path.basename(path).split('.').pop(0))
+  module.__file__=path
+  exec(compile(code,ref+':'+path,'exec'),module.__dict__)
+  return module
+
+@contextlib.contextmanager
+def timer(label,count=None,unit='files'):
+  start=time.perf_counter()
+  yield
+  dt=time.perf_counter()-start
+  if count is None:
+    print('%-40s %10.3f s'%(label,dt))
+  else:
+    print('%-40s %10.3f s  %12.1f %s/s'%(label,dt,count/max(dt,1e-9),unit))
+
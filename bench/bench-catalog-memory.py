@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import sys,argparse,tracemalloc
+
+import BenchUtil
+import RunFileUtil
+
+cli=argparse.ArgumentParser(description='Benchmark RunFileGroups catalog memory.')
+cli.add_argument('-r',metavar='#',help='number of runs',type=int,default=1000)
+cli.add_argument('-f',metavar='#',help='number of files per run',type=int,default=1000)
+cli.add_argument('-b',metavar='REF',help='git commit of the reference RunFileUtil (default=the first)',type=str,default=None)
+args=cli.parse_args(sys.argv[1:])
+
+# the RunFile/RunFileGroup/RunFileGroups classes this replaced:
+baseline=BenchUtil.getBaseline('lib/util/RunFileUtil.py',args.b)
+
+def paths():
+  for run in range(5000,5000+args.r):
+    for fileno in range(args.f):
+      # build each string separately, like reading them from disk:
+      yield ''.join(['/mss/clas12/rg-a/data/clas_%.6d/'%run,'clas_%.6d.evio.%.5d'%(run,fileno)])
+
+n=args.r*args.f
+
+# only measure the catalog, not the bounded run/file number cache:
+tracemalloc.start()
+catalog=baseline.RunFileGroups()
+catalog.addRuns(range(5000,5000+args.r))
+for x in paths():
+  rf=baseline.RunFile(x)
+  # the files are in order, so append what its quadratic add would insert:
+  list.append(catalog[rf.runNumber],rf)
+  catalog[rf.runNumber].runNumber=rf.runNumber
+ref,_=tracemalloc.get_traced_memory()
+tracemalloc.stop()
+if catalog.getFileCount()!=n or catalog.getFlatList()!=list(paths()):
+  print('ERROR:  reference catalog contents differ')
+  sys.exit(1)
+del catalog
+print('%-40s %10.1f MB  %8.1f bytes/file'%('baseline RunFileGroups',ref/1e6,ref/n))
+
+tracemalloc.start()
+rfgs=RunFileUtil.RunFileGroups()
+rfgs.addRuns(range(5000,5000+args.r))
+for x in paths():
+  rfgs.addFile(x)
+RunFileUtil.getMatcher().clearCache()
+new,_=tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print('%-40s %10.1f MB  %8.1f bytes/file'%('RunFileGroups',new/1e6,new/n))
+
+if rfgs.getFileCount()!=n or rfgs.getFlatList()!=list(paths()):
+  print('ERROR:  catalog contents differ')
+  sys.exit(1)
+
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import os,sys,zlib,hashlib,argparse,tempfile,resource
+
+import BenchUtil
+import JLabTape
+
+cli=argparse.ArgumentParser(description='Benchmark md5+crc32 checksum throughput.')
+cli.add_argument('-m',metavar='#',help='file size in MB',type=int,default=1024)
+cli.add_argument('-c',metavar='#',help='chunk size in MB',type=int,default=JLabTape.CHUNK_SIZE//1024//1024)
+cli.add_argument('--old',help='also run the previous whole-file read() and readlines() checksums',default=False,action='store_true')
+args=cli.parse_args(sys.argv[1:])
+
+def old(path):
+  # the previous two-pass implementation, holding the whole file in memory:
+  with open(path,'rb') as f:
+    x=hashlib.md5()
+    x.update(f.read())
+    md5=str(x.hexdigest())
+  x=0
+  with open(path,'rb') as f:
+    for line in f.readlines():
+      x=zlib.crc32(line,x)
+  return md5,'%x'%x
+
+def maxrss():
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+with tempfile.NamedTemporaryFile() as f:
+  block=os.urandom(1024*1024)
+  for ii in range(args.m):
+    f.write(block)
+  f.flush()
+  with BenchUtil.timer('single-pass md5+crc32',args.m,'MB'):
+    new=JLabTape.checksum(f.name,chunkSize=args.c*1024*1024)
+  print('%-40s %10.1f MB'%('peak RSS',maxrss()))
+  if args.old:
+    with BenchUtil.timer('two-pass md5+crc32',args.m,'MB'):
+      ref=old(f.name)
+    print('%-40s %10.1f MB'%('peak RSS',maxrss()))
+    if new!=ref:
+      print('ERROR:  checksums differ')
+      sys.exit(1)
+
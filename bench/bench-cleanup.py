@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import os,sys,argparse
+
+import BenchUtil
+import ChefUtil
+from ChefConfig import CFG
+from CLAS12Job import CLAS12Job
+from CLAS12Workflow import CLAS12Workflow
+from SwifWorkflow import SwifWorkflow
+from RunFileUtil import RunFile
+
+cli=argparse.ArgumentParser(description='Benchmark generating delete and move jobs.')
+cli.add_argument('-n',metavar='#',help='maximum number of files',type=int,default=int(1e6))
+cli.add_argument('-l',metavar='#',help='maximum number of files for the pop(0) references',type=int,default=int(1e5))
+args=cli.parse_args(sys.argv[1:])
+
+def workflow():
+  # without discovering input files, as CLAS12Workflow.__init__ would:
+  wf=CLAS12Workflow.__new__(CLAS12Workflow)
+  SwifWorkflow.__init__(wf,'bench')
+  wf.cfg=dict(CFG)
+  wf.cfg['decDir']='/cache/clas12/bench/decoded'
+  wf.logDir=None
+  wf.ignored=[]
+  return wf
+
+def popDelete(wf,phase,deletes):
+  # the delete this replaced, with its list copy and pop(0) chunking,
+  # and three RunFiles per job (with CLAS12Job for the missing Job):
+  jobs=[]
+  files = list(deletes)
+  while len(files)>0:
+    deletes=[]
+    while len(deletes)<200 and len(files)>0:
+      deletes.append(files.pop(0))
+    if len(deletes)>0:
+      job=CLAS12Job(wf.name,wf.cfg)
+      job.setPhase(phase)
+      job.setRam('512MB')
+      job.setTime('%ds'%(60+3*len(deletes)))
+      job.setDisk('100MB')
+      job.setRun(RunFile(deletes[0]).runNumber)
+      f1=RunFile(deletes[0]).fileNumber
+      f2=RunFile(deletes[len(deletes)-1]).fileNumber
+      job.addTag('file','%.5d-%.5d'%(f1,f2))
+      job.addTag('mode','delete')
+      cmds = [ '(sleep 0.5 ; rm -f %s)'%delete for delete in deletes ]
+      job.setCmd(' ; '.join(cmds))
+      wf.addJob(job)
+      jobs.append(job)
+  return jobs
+
+def popMove(wf,phase,moves):
+  # the move this replaced, likewise, with a mkdir per job:
+  jobs=[]
+  files = list(moves)
+  while len(files)>0:
+    moves=[]
+    while len(moves)<200 and len(files)>0:
+      moves.append(files.pop(0))
+    if len(moves)>0:
+      job=CLAS12Job(wf.name,wf.cfg)
+      job.setPhase(phase)
+      job.setRam('512MB')
+      job.setTime('%ds'%(600+60*len(moves)))
+      job.setDisk('100MB')
+      job.setRun(RunFile(moves[0]).runNumber)
+      job.addTag('mode','move')
+      job.addTag('outDir',wf.cfg['decDir'])
+      outDir='%s/%.6d'%(wf.cfg['decDir'],int(job.getTag('run')))
+      ChefUtil.mkdir(outDir)
+      cmd = '(sleep 0.5 ; set d=%s ; touch -c $d ; rsync $d %s/ ; rsync $d %s/ && rm -f $d)'
+      cmds = [ cmd%(move,outDir,outDir) for move in moves ]
+      job.setCmd(' ; '.join(cmds)+' ; true')
+      for move in moves:
+        job.outputData.append('%s/%s'%(outDir,os.path.basename(move)))
+      wf.addJob(job)
+      jobs.append(job)
+  return jobs
+
+def same(a,b):
+  key=lambda x:(x.cmd,list(x.tags.items()),x.outputData,x.time)
+  return [key(x) for x in a]==[key(x) for x in b]
+
+n=1000
+while n<=args.n:
+  files=['/cache/clas12/bench/clas_%.6d/clas_%.6d.evio.%.5d'%(5000+ii//1000,5000+ii//1000,ii%1000) for ii in range(n)]
+  with BenchUtil.timer('delete, %d files'%n,n):
+    deletes=workflow().delete(0,files)
+  with BenchUtil.timer('move, %d files'%n,n):
+    moves=workflow().move(1,files)
+  if n<=args.l:
+    with BenchUtil.timer('pop(0) delete reference, %d files'%n,n):
+      ref=popDelete(workflow(),0,files)
+    if not same(deletes,ref):
+      print('ERROR:  delete jobs differ')
+      sys.exit(1)
+    with BenchUtil.timer('pop(0) move reference, %d files'%n,n):
+      ref=popMove(workflow(),1,files)
+    if not same(moves,ref):
+      print('ERROR:  move jobs differ')
+      sys.exit(1)
+  n*=10
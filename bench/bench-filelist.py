@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+import os,sys,gzip,argparse,tempfile
+
+import BenchUtil
+import RunFileUtil
+
+cli=argparse.ArgumentParser(description='Benchmark streaming ingestion of large file lists.')
+cli.add_argument('-n',metavar='#',help='number of lines',type=int,default=int(1e6))
+cli.add_argument('-r',metavar='#',help='number of runs',type=int,default=1000)
+args=cli.parse_args(sys.argv[1:])
+
+def lines():
+  for ii in range(args.n):
+    run=5000+ii%args.r
+    yield '/mss/clas12/rg-a/data/clas_%.6d/clas_%.6d.evio.%.5d\n'%(run,run,ii//args.r)
+
+with tempfile.TemporaryDirectory() as d:
+  with open(d+'/files.txt','w') as f:
+    f.writelines(lines())
+  with gzip.open(d+'/files.txt.gz','wt') as f:
+    f.writelines(lines())
+  for x in ['files.txt','files.txt.gz']:
+    with BenchUtil.timer('getRunList, '+x,args.n,'lines'):
+      runs=RunFileUtil.getRunList(d+'/'+x)
+    with BenchUtil.timer('findFiles, '+x,args.n,'lines'):
+      rfgs=RunFileUtil.RunFileGroups()
+      rfgs.addRuns(runs)
+      rfgs.findFiles(d+'/'+x)
+    if rfgs.getFileCount()!=args.n:
+      print('ERROR:  found %d files'%rfgs.getFileCount())
+      sys.exit(1)
+
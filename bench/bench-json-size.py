@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import os,sys,shutil,argparse,tempfile
+
+import BenchUtil
+import CLAS12Jobs
+from ChefConfig import CFG
+from SwifWorkflow import SwifWorkflow
+
+cli=argparse.ArgumentParser(description='Benchmark workflow JSON size, with and without a shared environment script.')
+cli.add_argument('-n',metavar='#',help='number of jobs',type=int,default=int(1e4))
+args=cli.parse_args(sys.argv[1:])
+
+cfg=dict(CFG)
+cfg.update({'model':'dec','coatjava':'/group/clas12/packages/coatjava/10.0.0','torus':-1.0,'solenoid':-1.0,
+  'decDir':'/cache/clas12/bench/decoded','logDir':'/farm_out/bench'})
+
+def workflow():
+  # decoding jobs, without discovering input files:
+  wf=SwifWorkflow('bench')
+  for ii in range(args.n):
+    job=CLAS12Jobs.DecodingJob(wf.name,cfg)
+    job.setLogDir(cfg['logDir'])
+    job.addInputData('/mss/clas12/bench/data/clas_%.6d/clas_%.6d.evio.%.5d'%(5000+ii//1000,5000+ii//1000,ii%1000))
+    job.setCmd()
+    wf.addJob(job)
+  return wf
+
+directory=tempfile.mkdtemp()
+for envScript in [False,True]:
+  wf=workflow()
+  if envScript:
+    wf.writeEnvScripts(directory)
+  for compact in [False,True]:
+    label='%s%s'%('envScript' if envScript else 'inline',', compact' if compact else '')
+    path='%s/%s.json'%(directory,label)
+    with BenchUtil.timer('writeJson %s, %d jobs'%(label,args.n),args.n,'jobs'):
+      with open(path,'w') as out:
+        wf.writeJson(out,compact)
+    print('%-40s %10.1f MB %10.0f bytes/job'%('size',os.path.getsize(path)/1e6,os.path.getsize(path)/args.n))
+shutil.rmtree(directory)
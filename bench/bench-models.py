@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+import os,re,sys,json,stat,shutil,zipfile,argparse,tempfile,subprocess
+
+import BenchUtil
+import ChefConfig
+
+cli=argparse.ArgumentParser(description='Benchmark workflow generation for every model, end to end and offline, with stand-ins for tape stubs, CLARA/COATJAVA, RCDB, CCDB, java, jar, hipo-utils and swif2.')
+cli.add_argument('-n',metavar='#',help='numbers of input files (default=%(default)s)',type=int,nargs='+',default=[int(1e3),int(1e4),int(1e5)])
+cli.add_argument('-f',metavar='#',help='files per run (default=%(default)s)',type=int,default=100)
+cli.add_argument('-p',metavar='#',help='phaseSize for RollingRuns (default=%(default)s)',type=int,default=10)
+cli.add_argument('-m',metavar='MODEL',help='models (default=all)',action='append',default=[],choices=ChefConfig.CHOICES['model'])
+cli.add_argument('-o',metavar='PATH',help='scratch outDir, created and removed for each configuration (default=in the temporary directory)',type=str,default=None)
+cli.add_argument('-j',metavar='PATH',help='write results to this JSON file',type=str,default=None)
+cli.add_argument('-x',metavar='ARG',help='extra clas12-workflow argument, repeatable (e.g. -x=--groupBytes=2e10)',action='append',default=[])
+cli.add_argument('--submit',help='also submit each workflow to the fake swif2',action='store_true',default=False)
+args=cli.parse_args(sys.argv[1:])
+
+if len(args.m)==0:
+  args.m=ChefConfig.CHOICES['model']
+
+RECON_CLASSES=['org.jlab.io.clara.HipoToHipoReader','org.jlab.io.clara.HipoToHipoWriter',
+    'org.jlab.clas.swimtools.MagFieldsEngine','org.jlab.rec.ft.cal.FTCALEngine',
+    'org.jlab.service.dc.DCHBEngine','org.jlab.service.dc.DCTBEngine','org.jlab.service.ec.ECEngine']
+GRAPES_CLASSES=['org.jlab.jnp.grapes.io.HipoFrameReader','org.jlab.jnp.grapes.io.HipoFrameWriter',
+    'org.jlab.jnp.grapes.services.GenericWagon']
+
+RECON_YAML='''io-services:
+  reader:
+    class: %s
+    name: HipoToHipoReader
+  writer:
+    class: %s
+    name: HipoToHipoWriter
+services:
+  - class: %s
+    name: MAGFIELDS
+  - class: %s
+    name: FTCAL
+  - class: %s
+    name: DCHB
+  - class: %s
+    name: DCTB
+  - class: %s
+    name: EC
+configuration:
+  global:
+    variation: bench
+    timestamp: 12/31/2020-00:00:00
+  io-services:
+    writer:
+      schema_dir: "%%s"
+mime-types:
+  - binary/data-hipo
+'''%tuple(RECON_CLASSES)
+
+# the executables just have to satisfy what the workflow generator asks of them:
+FAKE_BIN={
+'java':'''import sys
+sys.stderr.write('openjdk version "21" (fake)\\n')
+''',
+'jar':'''import sys,zipfile
+for x in zipfile.ZipFile(sys.argv[2]).namelist():
+  print(x)
+''',
+'hipo-utils':'''import sys
+print('fake hipo-utils : number of events = %d'%(1000+len(sys.argv[-1])))
+''',
+}
+
+# stand-ins for the RCDB and CCDB python modules:
+FAKE_PYTHON={
+'rcdb':'''class _Named():
+  def __init__(self,name,value=None):
+    self.name=name
+    self.value=value
+class RCDBProvider():
+  def __init__(self,uri):
+    pass
+  def get_condition_types(self):
+    return [_Named(x) for x in ['solenoid_scale','torus_scale','run_start_time','user_comment','test']]
+  def get_condition(self,run,name):
+    if name=='solenoid_scale': return _Named(name,-1.0)
+    if name=='torus_scale': return _Named(name,1.0 if run%2 else -1.0)
+    if name=='run_start_time': return _Named(name,'2020-01-01 00:00:00')
+    if name=='user_comment': return _Named(name,'fake run %d'%run)
+    raise KeyError(name)
+  def disconnect(self):
+    pass
+''',
+'ccdb':'''class _Named():
+  def __init__(self,name):
+    self.name=name
+class AlchemyProvider():
+  def connect(self,uri):
+    pass
+  def get_variations(self):
+    return [_Named(x) for x in ['default','bench']]
+  def disconnect(self):
+    pass
+''',
+}
+
+def makeJar(path,classes):
+  os.makedirs(os.path.dirname(path),exist_ok=True)
+  with zipfile.ZipFile(path,'w') as z:
+    z.writestr('META-INF/MANIFEST.MF','Manifest-Version: 1.0\n')
+    for x in classes:
+      z.writestr(x.replace('.','/')+'.class','')
+
+def makeFakes(topdir):
+  # a CLARA install with COATJAVA, GRAPES and JCLARA jars:
+  clara=topdir+'/clara'
+  makeJar(clara+'/plugins/clas12/lib/clas/coat-libs-10.0.2.jar',RECON_CLASSES)
+  makeJar(clara+'/plugins/grapes/lib/core/grapes-2.17.jar',GRAPES_CLASSES)
+  makeJar(clara+'/lib/jclara-5.0.2.jar',[])
+  os.makedirs(clara+'/plugins/clas12/etc/bankdefs/hipo4/singles/dst')
+  with open(topdir+'/recon.yaml','w') as f:
+    f.write(RECON_YAML%(clara+'/plugins/clas12/etc/bankdefs/hipo4/singles/dst'))
+  os.makedirs(topdir+'/bin')
+  for name,code in FAKE_BIN.items():
+    with open(topdir+'/bin/'+name,'w') as f:
+      f.write('#!'+sys.executable+'\n'+code)
+    os.chmod(topdir+'/bin/'+name,stat.S_IRWXU)
+  os.makedirs(topdir+'/python')
+  for name,code in FAKE_PYTHON.items():
+    with open(topdir+'/python/'+name+'.py','w') as f:
+      f.write(code)
+  os.makedirs(topdir+'/home')
+  os.makedirs(topdir+'/run')
+
+# run the generator with the scratch outDir's top directory, e.g. /tmp,
+# accepted like /volatile:
+WRAPPER='''import sys,runpy,ChefConfig
+ChefConfig._VALIDREMOTES.append(sys.argv.pop(1))
+sys.argv.pop(0)
+runpy.run_path(sys.argv[0],run_name='__main__')
+'''
+
+def run(topdir,model,nfiles,phaseSize):
+  nruns=max(1,nfiles//args.f)
+  outDir='%s/%s-%d-%d'%(args.o,model,nfiles,phaseSize)
+  cmd=[sys.executable,'-c',WRAPPER,'/'+args.o.strip('/').split('/').pop(0),
+      BenchUtil._TOPDIR+'/bin/.clas12-workflow.py',
+      '--runGroup','rga','--tag','bench','--model',model,
+      '--runs','%d-%d'%(5000,5000+nruns-1),
+      '--inputs',topdir+('/evio' if model.startswith('dec') else '/hipo'),
+      '--outDir',outDir,'--workDir',outDir+'/work','--logDir',topdir+'/logs',
+      '--clara',topdir+'/clara','--phaseSize',str(phaseSize),
+      '--profile',topdir+'/run/profile.json','--compact']
+  if model.find('rec')>=0:
+    cmd.extend(['--reconYaml',topdir+'/recon.yaml'])
+  if model.find('ana')>=0:
+    cmd.extend(['--trainYaml','rf'])
+  cmd.extend(args.x)
+  if args.submit:
+    cmd.extend(['--submit','--shardSize','1000'])
+  # workflow names repeat across configurations:
+  shutil.rmtree(ENV['FAKE_SWIF2_DIR'],ignore_errors=True)
+  for x in os.listdir(topdir+'/run'):
+    os.remove(topdir+'/run/'+x)
+  with open(topdir+'/run/log.txt','w') as log:
+    p=subprocess.Popen(cmd,cwd=topdir+'/run',env=ENV,stdout=log,stderr=subprocess.STDOUT)
+    # wait4 gives the resources of this child alone:
+    _,status,usage=os.wait4(p.pid,0)
+    p.returncode=os.waitstatus_to_exitcode(status)
+  shutil.rmtree(outDir,ignore_errors=True)
+  result={'model':model,'workflow':'RollingRuns' if phaseSize>0 else 'MinimalDependency',
+      'files':nfiles,'runs':nruns,'jobs':None,'seconds':None,'maxrss':usage.ru_maxrss*1024}
+  with open(topdir+'/run/log.txt','r') as log:
+    for line in log:
+      m=re.search('Created workflow with (\d+) jobs',line)
+      if m is not None:
+        result['jobs']=int(m.group(1))
+  if p.returncode!=0 or result['jobs'] is None:
+    print('ERROR:  %s failed:'%' '.join(cmd[4:]))
+    with open(topdir+'/run/log.txt','r') as log:
+      print(''.join(log.readlines()[-10:]))
+    return None
+  with open(topdir+'/run/profile.json','r') as f:
+    profile=json.load(f)
+  result['seconds']=profile['seconds']
+  result['stages']=dict([(k,v['seconds']) for k,v in profile['stages'].items()])
+  return result
+
+topdir=tempfile.mkdtemp()
+if args.o is None:
+  args.o=topdir+'/out'
+try:
+  maxruns=max(1,max(args.n)//args.f)
+  with BenchUtil.timer('stub trees and fake install, %d files'%(2*maxruns*args.f)):
+    BenchUtil.makeStubTree(topdir+'/evio',maxruns,args.f)
+    BenchUtil.makeStubTree(topdir+'/hipo',maxruns,args.f,suffix='.hipo')
+    makeFakes(topdir)
+
+  ENV=dict(os.environ)
+  ENV['HOME']=topdir+'/home'
+  ENV['PATH']=topdir+'/bin'+os.pathsep+ENV.get('PATH','')
+  ENV['PYTHONPATH']=os.pathsep.join([topdir+'/python']+[BenchUtil._TOPDIR+'/lib/'+x for x in ['clas12','hps','swif','util']])
+  ENV['SWIF2']=BenchUtil._TOPDIR+'/bench/fake-swif2'
+  ENV['FAKE_SWIF2_DIR']=topdir+'/swif2'
+
+  results,failed=[],0
+  print('%-14s %-18s %8s %8s %9s %10s %9s %9s %9s'%('model','workflow','files','jobs','seconds','jobs/s','RSS/MB','config/s','generate/s'))
+  for model in args.m:
+    for phaseSize in [-1,args.p]:
+      for nfiles in args.n:
+        r=run(topdir,model,nfiles,phaseSize)
+        if r is None:
+          failed+=1
+          continue
+        results.append(r)
+        print('%-14s %-18s %8d %8d %9.3f %10.1f %9.1f %9.3f %9.3f'%(model,r['workflow'],nfiles,r['jobs'],
+            r['seconds'],r['jobs']/max(r['seconds'],1e-9),r['maxrss']/1e6,r['stages']['config'],r['stages']['generate']))
+        sys.stdout.flush()
+
+  if args.j is not None:
+    with open(args.j,'w') as f:
+      json.dump(results,f,indent=2,separators=(',',': '))
+      f.write('\n')
+
+finally:
+  shutil.rmtree(topdir)
+
+if failed>0:
+  print('ERROR:  %d configurations failed'%failed)
+  sys.exit(1)
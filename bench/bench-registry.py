@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import sys,argparse
+
+import BenchUtil
+from SwifJob import SwifJob,JputJob
+from SwifWorkflow import SwifWorkflow
+
+cli=argparse.ArgumentParser(description='Benchmark SwifWorkflow job lookups and dependency bookkeeping.')
+cli.add_argument('-n',metavar='#',help='maximum number of jobs',type=int,default=int(1e5))
+cli.add_argument('-p',metavar='#',help='jobs per phase',type=int,default=100)
+cli.add_argument('-l',metavar='#',help='maximum number of jobs for the scanning reference',type=int,default=int(1e4))
+args=cli.parse_args(sys.argv[1:])
+
+def scanJobs(wf,phase):
+  # the scan over all jobs that the phase index replaced:
+  return [job for job in wf.jobs if job.phase==phase]
+
+def scanJob(wf,name):
+  # the scan over all jobs that the name index replaced:
+  for job in wf.jobs:
+    if job.getJobName()==name:
+      return job
+
+n=1000
+while n<=args.n:
+  wf=SwifWorkflow('bench')
+  with BenchUtil.timer('%d jobs with antecedents'%n,n,'jobs'):
+    for ii in range(n):
+      job=SwifJob('bench')
+      job.setPhase(ii//args.p)
+      job.addTag('run','%.6d'%(5000+ii//args.p))
+      job.addTag('mode','dec')
+      job.addOutput('out.hipo','/cache/clas12/bench/%.6d/out_%.5d.hipo'%(5000+ii//args.p,ii))
+      # every job in the previous phase:
+      for x in wf.getJobs(job.phase-1):
+        job.antecedents.append(x.getJobName())
+      wf.addJob(job)
+  with BenchUtil.timer('%d jobs by phase'%n,n,'jobs'):
+    for phase in range(n//args.p):
+      wf.getJobs(phase)
+  if n<=args.l:
+    with BenchUtil.timer('%d jobs by phase, scanning reference'%n,n,'jobs'):
+      for phase in range(n//args.p):
+        if scanJobs(wf,phase)!=wf.getJobs(phase):
+          print('ERROR:  phase index differs')
+          sys.exit(1)
+  # the antecedent resolution in submitJson:
+  nant=sum([len(job.antecedents) for job in wf.jobs])
+  with BenchUtil.timer('%d jobs antecedents by name'%n,nant,'lookups'):
+    for job in wf.jobs:
+      for x in job.antecedents:
+        wf.getJob(x)
+  if n<=args.l:
+    # one lookup per phase, the scan is too slow for all of them:
+    with BenchUtil.timer('%d jobs antecedents by name, scanning reference'%n,len(wf.jobs[args.p::args.p]),'lookups'):
+      for job in wf.jobs[args.p::args.p]:
+        x=next(iter(job.antecedents))
+        if scanJob(wf,x) is not wf.getJob(x):
+          print('ERROR:  name index differs')
+          sys.exit(1)
+  with BenchUtil.timer('%d jobs jput'%n,n,'jobs'):
+    jput=JputJob('bench')
+    jput.addJputs(wf.jobs)
+  if len(jput.jputfiles)!=n:
+    print('ERROR:  jput has %d files'%len(jput.jputfiles))
+    sys.exit(1)
+  n*=10
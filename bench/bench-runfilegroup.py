@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+import sys,random,argparse
+
+import BenchUtil
+import RunFileUtil
+
+cli=argparse.ArgumentParser(description='Benchmark RunFileGroup insertion scaling.')
+cli.add_argument('-n',metavar='#',help='maximum number of files',type=int,default=int(1e6))
+cli.add_argument('-l',metavar='#',help='maximum number of files for the linear reference',type=int,default=int(1e4))
+args=cli.parse_args(sys.argv[1:])
+
+def linear(rfs):
+  # the linear duplicate check and insertion that RunFileGroup.add replaced:
+  group=[]
+  for rf in rfs:
+    if rf in group:
+      raise ValueError('duplicate')
+    for ii in range(len(group)):
+      if rf < group[ii]:
+        group.insert(ii,rf)
+        break
+    else:
+      group.append(rf)
+  return group
+
+n=1000
+while n<=args.n:
+  fileNumbers=list(range(n))
+  random.seed(n)
+  random.shuffle(fileNumbers)
+  rfs=[RunFileUtil.RunFile('clas_005000.evio.%.5d'%x) for x in fileNumbers]
+  with BenchUtil.timer('RunFileGroup.add, %d files'%n,n):
+    rfg=RunFileUtil.RunFileGroup()
+    for rf in rfs:
+      rfg.add(rf)
+    # the first read sorts:
+    rfg[0]
+  if n<=args.l:
+    with BenchUtil.timer('linear reference, %d files'%n,n):
+      ref=linear(rfs)
+    if [x.fileNumber for x in ref]!=[x.fileNumber for x in rfg]:
+      print('ERROR:  ordering differs')
+      sys.exit(1)
+  n*=10
+
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import os,sys,time,argparse,tempfile
+
+import BenchUtil
+import RunFileUtil
+
+cli=argparse.ArgumentParser(description='Benchmark input discovery on a synthetic stub tree.')
+cli.add_argument('-r',metavar='#',help='number of runs',type=int,default=200)
+cli.add_argument('-f',metavar='#',help='number of files per run',type=int,default=200)
+cli.add_argument('-t',metavar='#',help='number of scan threads',type=int,default=16)
+args=cli.parse_args(sys.argv[1:])
+
+def walk(dirName):
+  # the serial os.walk discovery that scanDir replaces:
+  rfgs=RunFileUtil.RunFileGroups()
+  rfgs.addRuns(range(5000,5000+args.r))
+  for dirpath,dirnames,filenames in os.walk(dirName):
+    for filename in filenames:
+      if not filename.startswith('.'):
+        rfgs.addFile(dirpath+'/'+filename)
+  return rfgs
+
+with tempfile.TemporaryDirectory() as d:
+  n=len(BenchUtil.makeStubTree(d,args.r,args.f))
+  with BenchUtil.timer('os.walk discovery',n):
+    a=walk(d)
+  with BenchUtil.timer('scandir discovery (%d threads)'%args.t,n):
+    RunFileUtil.setScanThreads(args.t)
+    b=RunFileUtil.RunFileGroups()
+    b.addRuns(range(5000,5000+args.r))
+    b.addDir(d)
+  if a.getFlatList()!=b.getFlatList():
+    print('ERROR:  discovery results differ')
+    sys.exit(1)
+  # only a tenth of the runs registered, so the rest are pruned:
+  runs=range(5000,5000+args.r,10)
+  with BenchUtil.timer('pruned discovery (%d runs)'%len(runs),n):
+    c=RunFileUtil.RunFileGroups()
+    c.addRuns(runs)
+    c.addDir(d)
+  if c.getFlatList()!=[x for x in b.getFlatList() if RunFileUtil.RunFile(x).runNumber in runs]:
+    print('ERROR:  pruned discovery results differ')
+    sys.exit(1)
+  # cold and warm scans with the persistent directory index, which does
+  # not cache directories modified in the last few seconds:
+  os.makedirs(d+'/.index')
+  for dirpath,dirnames,filenames in os.walk(d):
+    os.utime(dirpath,(time.time()-60,time.time()-60))
+  RunFileUtil.setDirIndex(d+'/.index/dirindex.sqlite')
+  for label in ['cold','warm']:
+    with BenchUtil.timer('indexed scan (%s)'%label,n):
+      x=RunFileUtil.scanDir(d)
+    if sorted(x)!=sorted(b.getFlatList()):
+      print('ERROR:  indexed discovery results differ')
+      sys.exit(1)
+
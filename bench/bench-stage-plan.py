@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+import sys,argparse,tempfile
+
+import BenchUtil
+import JLabTape
+import RunFileUtil
+from TapeStaging import StagingPlan
+
+cli=argparse.ArgumentParser(description='Benchmark and check tape staging plans on a synthetic stub tree.')
+cli.add_argument('-r',metavar='#',help='number of runs',type=int,default=100)
+cli.add_argument('-f',metavar='#',help='number of files per run',type=int,default=100)
+cli.add_argument('-t',metavar='#',help='maximum number of tapes per batch',type=int,default=4)
+args=cli.parse_args(sys.argv[1:])
+
+with tempfile.TemporaryDirectory() as d:
+  JLabTape.MSS=d+'/'
+  n=len(BenchUtil.makeStubTree(d,args.r,args.f,tapes=10))
+  rfgs=RunFileUtil.RunFileGroups()
+  rfgs.addRuns(range(5000,5000+args.r))
+  rfgs.addDir(d)
+  with BenchUtil.timer('staging plan',n):
+    plan=StagingPlan(rfgs.getFlatList())
+    batches=plan.getBatches(args.t)
+  if sum([len(x) for x in plan.tapes.values()])!=n:
+    print('ERROR:  files missing from plan')
+    sys.exit(1)
+  for tape,files in plan.tapes.items():
+    if [x[0] for x in files]!=sorted([x[0] for x in files]):
+      print('ERROR:  tape %s is not in position order'%tape)
+      sys.exit(1)
+  if max([len(x) for x in batches])>args.t:
+    print('ERROR:  too many tapes per batch')
+    sys.exit(1)
+  print('%d files, %d tapes, %d batches'%(n,len(plan.tapes),len(batches)))
+
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import os,sys,json,shutil,argparse,tempfile
+
+import BenchUtil
+
+cli=argparse.ArgumentParser(description='Benchmark workflow submission against a fake swif2.')
+cli.add_argument('-n',metavar='#',help='number of jobs',type=int,default=int(2e3))
+cli.add_argument('-p',metavar='#',help='jobs per phase',type=int,default=500)
+cli.add_argument('-s',metavar='#',help='jobs per shard',type=int,default=250)
+cli.add_argument('-t',metavar='#',help='concurrent add-jobs',type=int,default=4)
+cli.add_argument('-f',metavar='#',help='probability of transient import and add-job failures',type=float,default=0.01)
+args=cli.parse_args(sys.argv[1:])
+
+os.environ['SWIF2']=os.path.dirname(os.path.realpath(__file__))+'/fake-swif2'
+os.environ['FAKE_SWIF2_DIR']=tempfile.mkdtemp()
+
+from SwifJob import SwifJob
+from SwifWorkflow import SwifWorkflow
+
+def workflow(name,interleaved=False):
+  # each job depends on one in the previous phase.  Interleaved, phases
+  # alternate from job to job like with RollingRuns:
+  wf=SwifWorkflow(name)
+  nphases=(args.n+args.p-1)//args.p
+  for ii in range(args.n):
+    job=SwifJob(name)
+    job.setPhase(ii%nphases if interleaved else ii//args.p)
+    job.setCmd('true')
+    previous=wf.getJobs(job.phase-1)
+    if len(previous)>0:
+      job.antecedents.append(previous[len(wf.getJobs(job.phase))%len(previous)].getJobName())
+    wf.addJob(job)
+  return wf
+
+for label,shardSize,failures,interleaved in [('single import',0,0,False),
+                                             ('sharded',args.s,0,False),
+                                             ('sharded, interleaved phases',args.s,0,True),
+                                             ('sharded with failures',args.s,args.f,False)]:
+  os.environ['FAKE_SWIF2_FAIL']=str(failures)
+  wf=workflow('bench%d'%len(label),interleaved)
+  if shardSize>0:
+    shards=wf.getShards(shardSize)
+    if len(shards)!=sum([(len(wf.getJobs(x))+shardSize-1)//shardSize for x in set([j.phase for j in wf.jobs])]):
+      print('ERROR:  %d shards are not grouped by phase'%len(shards))
+      sys.exit(1)
+    label+=', %d shards'%len(shards)
+  with BenchUtil.timer('%s, %d jobs'%(label,args.n),args.n,'jobs'):
+    wf.submitJson(shardSize,args.t)
+  imported=json.load(open('%s/%s.json'%(os.environ['FAKE_SWIF2_DIR'],wf.name)))
+  if len(imported)!=args.n:
+    print('ERROR:  imported %d of %d jobs'%(len(imported),args.n))
+    sys.exit(1)
+
+# an empty workflow is still created when sharding:
+wf=SwifWorkflow('benchempty')
+wf.submitJson(args.s,args.t)
+if json.load(open('%s/%s.json'%(os.environ['FAKE_SWIF2_DIR'],wf.name)))!=[]:
+  print('ERROR:  empty workflow not imported')
+  sys.exit(1)
+
+shutil.rmtree(os.environ['FAKE_SWIF2_DIR'])
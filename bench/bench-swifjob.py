@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import os,sys,argparse,tracemalloc
+
+import BenchUtil
+from SwifJob import SwifJob,JputJob
+from SwifWorkflow import SwifWorkflow
+
+cli=argparse.ArgumentParser(description='Benchmark serializing SwifJobs, counting command builds and measuring JSON output memory.')
+cli.add_argument('-n',metavar='#',help='number of jobs',type=int,default=int(1e5))
+args=cli.parse_args(sys.argv[1:])
+
+builds=[0]
+_buildCommand=SwifJob._buildCommand
+def counted(self):
+  builds[0]+=1
+  return _buildCommand(self)
+SwifJob._buildCommand=counted
+
+def makeWorkflow():
+  workflow=SwifWorkflow('bench')
+  for ii in range(args.n):
+    job=SwifJob('bench')
+    for jj in range(10):
+      job.addEnv('VAR%d'%jj,'/group/clas12/packages/%d'%jj)
+    job.setTime('4h')
+    job.addTag('run','%.6d'%(5000+ii//1000))
+    job.addTag('file','%.5d'%(ii%1000))
+    job.addTag('mode','dec')
+    job.addInput('in.evio','/mss/clas12/bench/clas_%.6d.evio.%.5d'%(5000+ii//1000,ii%1000))
+    job.addOutput('out.hipo','/cache/clas12/bench/%.6d/out_%.5d.hipo'%(5000+ii//1000,ii%1000))
+    job.setCmd('decoder -o out.hipo in.evio')
+    workflow.addJob(job)
+  jobs=list(workflow.jobs)
+  for ii in range(0,len(jobs),30):
+    jput=JputJob('bench')
+    jput.addJputs(jobs[ii:ii+30])
+    workflow.addJob(jput)
+  return workflow
+
+with BenchUtil.timer('creating %d jobs'%args.n,args.n,'jobs'):
+  workflow=makeWorkflow()
+
+# writing a freshly generated workflow once is what clas12-workflow does:
+for x in ['cold','second']:
+  builds[0]=0
+  with BenchUtil.timer('%s writeJson of %d jobs'%(x,len(workflow.jobs)),len(workflow.jobs),'jobs'):
+    with open(os.devnull,'w') as out:
+      workflow.writeJson(out)
+  print('%d commands built for %d jobs'%(builds[0],len(workflow.jobs)))
+
+with BenchUtil.timer('writeJson (compact) of %d jobs'%len(workflow.jobs),len(workflow.jobs),'jobs'):
+  with open(os.devnull,'w') as out:
+    workflow.writeJson(out,True)
+
+# memory tracing is slow, so measured separately from timing, each on a
+# fresh workflow.  Retained is what's still allocated after writing:
+for label,func in [('writeJson',lambda w: w.writeJson(open(os.devnull,'w'))),
+                   ('getJson',lambda w: w.getJson())]:
+  workflow=makeWorkflow()
+  tracemalloc.start()
+  func(workflow)
+  current,peak=tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  print('%-40s %10.1f MB peak %10.1f MB retained'%(label+' memory',peak/1e6,current/1e6))
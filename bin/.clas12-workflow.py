@@ -1,30 +1,81 @@
 #!/usr/bin/env python3
-import sys,os,logging
+import sys,os,logging,argparse
 from Logging import ColoredLogger
-from ChefConfig import ChefConfig
 
 logger = logging.getLogger(__name__)
 
-cc=ChefConfig(sys.argv[1:])
-workflow=cc.getWorkflow()
+# --profile/--cprofile are peeked at before ChefConfig, so that its
+# configuration and YAML checks are also profiled:
+cli=argparse.ArgumentParser(add_help=False)
+cli.add_argument('--profile',default=None)
+cli.add_argument('--cprofile',default=None)
+prof=cli.parse_known_args(sys.argv[1:])[0]
+
+import Profiler
+profiler=Profiler.Profiler(prof.cprofile)
+if prof.profile is not None or prof.cprofile is not None:
+  import ChefUtil,ClaraYaml,JarUtil,RunFileUtil,RcdbManager,CLAS12Job,SwifWorkflow
+  for owner,attr in [(RunFileUtil,'scanDir'),
+                     (RcdbManager.RcdbManager,'load'),
+                     (ChefUtil,'getDecoderOpts'),
+                     (ChefUtil,'getUserComment'),
+                     (ClaraYaml,'checkIntegrity'),
+                     (JarUtil.JarContents,'__init__'),
+                     (ChefUtil,'getReconSeconds'),
+                     (ChefUtil,'countHipoEvents'),
+                     (ChefUtil,'mkdir'),
+                     (CLAS12Job.CLAS12Job,'doReadme'),
+                     (SwifWorkflow.SwifWorkflow,'writeJson')]:
+    profiler.instrument(owner,attr)
+  profiler.start()
+
+def finish(status=0):
+  if profiler.started is not None:
+    profiler.stop()
+    logger.info('Profile summary:\n'+profiler.getSummary())
+    if prof.profile is not None:
+      profiler.writeJson(prof.profile)
+      logger.info('Wrote profile to '+prof.profile)
+  sys.exit(status)
+
+from ChefConfig import ChefConfig
 
-workflow.generate()
+with profiler.stage('config'):
+  cc=ChefConfig(sys.argv[1:])
+
+with profiler.stage('discovery'):
+  workflow=cc.getWorkflow()
+
+with profiler.stage('generate'):
+  workflow.generate()
 
 logger.info('Created workflow with %d jobs based on %d runs with %d total input files and %d phases'%\
     (len(workflow.jobs),len(workflow.getRunList()),workflow.getFileCount(),workflow.phase+1))
 
 if os.path.exists(workflow.name+'.json'):
   logger.critical('File already exists:  '+workflow.name+'.json')
-  sys.exit(1)
+  finish(1)
+
+if cc.get('envScript'):
+  for x in workflow.getEnvScripts(os.path.realpath('.')):
+    if os.path.exists(x):
+      logger.critical('File already exists:  '+x)
+      finish(1)
+  with profiler.stage('envScript'):
+    workflow.writeEnvScripts(os.path.realpath('.'))
 
 logger.info('Writing workflow to %s/%s.json'%(os.path.realpath('.'),workflow.name))
-with open(workflow.name+'.json','w') as out:
-  out.write(workflow.getJson())
+with profiler.stage('json'):
+  with open(workflow.name+'.json','w') as out:
+    workflow.writeJson(out,cc.get('compact'))
 
 if len(workflow.ignored)>0:
     logger.warning('Ignored runs due to strict RCDB checking: '+'.'.join([str(x) for x in workflow.ignored]))
 
 if cc.get('submit'):
   logger.info('Submitting %s.json with %d jobs ...\n'%(workflow.name,len(workflow.jobs)))
-  workflow.submitJson()
+  with profiler.stage('submit'):
+    workflow.submitJson(cc.get('shardSize'))
+
+finish()
 
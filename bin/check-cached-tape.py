@@ -1,46 +1,153 @@
 #!/usr/bin/env python3
 import os
 import sys
+import time
+import random
 import logging
 import argparse
+from concurrent.futures import ProcessPoolExecutor,wait,FIRST_COMPLETED
 
 import JLabTape
+import StubIndex
 
 logging.basicConfig(level=logging.INFO,format='%(levelname)-9s[ %(name)-15s ] %(message)s')
+logger = logging.getLogger(__name__)
 
 cli = argparse.ArgumentParser('Compare /cache files with their /mss counterparts.')
 cli.add_argument('--crc32',help='compare crc32 checksums (slow)',default=False,action='store_true')
 cli.add_argument('--md5',help='compare md5 checksums (slow)',default=False,action='store_true')
+cli.add_argument('--tiered',help='size for all files, crc32 for a random sample and files modified after the tape write, md5 for crc32 failures',default=False,action='store_true')
+cli.add_argument('--sample',metavar='#',help='fraction of files sampled for crc32 in tiered mode (default=%(default)s)',type=float,default=0.01)
+cli.add_argument('--seed',metavar='#',help='random seed for tiered sampling',type=int,default=None)
+cli.add_argument('--workers',metavar='#',help='number of verification processes (default=%(default)s)',type=int,default=1)
+cli.add_argument('--journal',metavar='PATH',help='results journal, files already in it are skipped to resume an interrupted verification',type=str,default=None)
+cli.add_argument('--progress',metavar='#',help='seconds between progress reports (default=%(default)s)',type=int,default=60)
+cli.add_argument('--cache',metavar='PATH',help='persistent checksum cache, only new or modified files are read (default=%(default)s)',type=str,default='~/.clas12-workflow/checksums.sqlite')
+cli.add_argument('--nocache',help='disable the checksum cache',default=False,action='store_true')
+cli.add_argument('--evict',help='remove checksum cache entries for files that no longer exist under the given paths',default=False,action='store_true')
+cli.add_argument('--stubs',metavar='PATH',help='tape stub index from tape-stub-index.py, used instead of reading stubs (repeatable)',action='append',default=[])
 cli.add_argument('path', nargs='+',help='path of directory or file on /cache (repeatable)')
 args = cli.parse_args(sys.argv[1:])
 
-def check_cache_file(cache_path):
-  if not os.path.isfile('/mss'+cache_path[6:]):
-    return True
-  cache = JLabTape.CachedFile(cache_path, crc32=args.crc32, md5=args.md5)
-  tape = JLabTape.TapeStub('/mss'+cache_path[6:])
-  return cache == tape
-
-mismatch=[]
-
-for x in args.path:
-  if not x.startswith('/cache/'):
-    print('Ignoring non-/cache path: '+x)
-    continue
-  if os.path.isfile(x):
-    if not check_cache_file(x):
-      mismatch.append(x)
-  elif os.path.isdir(x):
-    for adir,subdirs,files in os.walk(x):
-      for f in files:
-        if not check_cache_file(adir+'/'+f):
-          mismatch.append(adir+'/'+f)
-  else:
-    print('Ignoring non-existent path:  '+x)
-    continue
+if len(args.stubs) > 0:
+  stubs = StubIndex.StubIndex()
+  for x in args.stubs:
+    stubs.load(x)
+  JLabTape.setStubIndex(stubs)
+
+if not args.nocache:
+  JLabTape.setChecksumCache(os.path.expanduser(args.cache))
+  if args.evict:
+    for x in args.path:
+      JLabTape.getChecksumCache().evict(x)
+
+if args.tiered and (args.crc32 or args.md5):
+  cli.error('--tiered chooses checksums itself, incompatible with --crc32/--md5')
+
+if args.sample < 0 or args.sample > 1:
+  cli.error('--sample must be between 0 and 1')
+
+random.seed(args.seed)
+
+# journal entries are only reused for the same comparison:
+if args.tiered:
+  mode = 'tiered'
+else:
+  mode = '+'.join([x for x in ['size','crc32','md5'] if x=='size' or getattr(args,x)])
+
+def find_cache_files(paths):
+  for x in paths:
+    if not x.startswith(JLabTape.CACHE):
+      print('Ignoring non-/cache path: '+x)
+      continue
+    if os.path.isfile(x):
+      yield x
+    elif os.path.isdir(x):
+      for adir,subdirs,files in os.walk(x):
+        for f in files:
+          yield adir+'/'+f
+    else:
+      print('Ignoring non-existent path:  '+x)
+
+def read_journal(path):
+  done = {}
+  if path is not None and os.path.isfile(path):
+    with open(path,'r') as f:
+      for line in f:
+        cols = line.rstrip('\n').split('\t')
+        if len(cols) == 3 and cols[0] == mode:
+          done[cols[2]] = cols[1]
+    logger.info('Resuming with %d files from journal %s'%(len(done),path))
+  return done
+
+done = read_journal(args.journal)
+journal = None if args.journal is None else open(args.journal,'a')
+mismatch = [ x for x,status in done.items() if status == 'mismatch' ]
+counts = {}
+start,last = time.time(),time.time()
+
+def submission(path):
+  # the verification function and its arguments for one file:
+  if args.tiered:
+    return JLabTape.verifyCachedFileTiered,(path,random.random()<args.sample)
+  return JLabTape.verifyCachedFile,(path,args.crc32,args.md5)
+
+def verify(func,fargs):
+  # worker processes only read the checksum cache, and return their
+  # new checksums so it has just one writer (it's often on NFS):
+  return func(*fargs),JLabTape.popChecksums()
+
+def record(path,result,checksums=None):
+  global last
+  if checksums is not None and len(checksums) > 0:
+    JLabTape.getChecksumCache().putRows(checksums)
+  # tiered verification also returns the deepest tier reached:
+  status,tier = result if isinstance(result,tuple) else (result,None)
+  counts[status] = counts.get(status,0) + 1
+  if tier is not None:
+    counts['tier%d'%tier] = counts.get('tier%d'%tier,0) + 1
+  if status == 'mismatch':
+    mismatch.append(path)
+  # errors may be transient, so leave them to be retried on resume:
+  if journal is not None and status != 'error':
+    journal.write('%s\t%s\t%s\n'%(mode,status,path))
+    journal.flush()
+  if time.time() - last > args.progress:
+    last = time.time()
+    n = sum([v for k,v in counts.items() if not k.startswith('tier')])
+    logger.info('Checked %d files in %.0f s (%.1f files/s):  %s'%(n,last-start,n/(last-start),
+      ' '.join(['%s=%d'%(k,v) for k,v in sorted(counts.items())])))
+
+todo = ( x for x in find_cache_files(args.path) if x not in done )
+
+if args.workers <= 1:
+  for x in todo:
+    func,fargs = submission(x)
+    record(x,func(*fargs))
+else:
+  with ProcessPoolExecutor(max_workers=args.workers) as pool:
+    pending = {}
+    for x in todo:
+      func,fargs = submission(x)
+      pending[pool.submit(verify,func,fargs)] = x
+      # keep a bounded number of files in flight:
+      if len(pending) >= 4*args.workers:
+        finished,_ = wait(pending,return_when=FIRST_COMPLETED)
+        for f in finished:
+          record(pending.pop(f),*f.result())
+    for f in list(pending):
+      record(pending.pop(f),*f.result())
+
+if journal is not None:
+  journal.close()
+
+JLabTape.setChecksumCache(None)
+
+if len(counts) > 0:
+  logger.info('Checked %d files in %.0f s:  %s'%(sum([v for k,v in counts.items() if not k.startswith('tier')]),
+    time.time()-start,' '.join(['%s=%d'%(k,v) for k,v in sorted(counts.items())])))
 
 if len(mismatch) == 0:
   print('No Mismatches Found.')
 else:
   print(str(len(mismatch))+' Mismatches Found:\n'+'\n'.join(mismatch))
-
@@ -2,6 +2,7 @@
 import os,sys,argparse,subprocess,logging,traceback,datetime
 
 import ChefUtil
+import RunFileUtil
 from RunFileUtil import getRunList
 from RunFileUtil import RunFileGroups,RunFile
 
@@ -17,8 +18,13 @@ cli.add_argument('-o',metavar='path',help='output prefix (automatically suffixed
 cli.add_argument('-a',help='allow and skip pre-existing outputs',default=False,action='store_true')
 cli.add_argument('-A',help='allow and delete pre-existing outputs',default=False,action='store_true')
 cli.add_argument('-d',help='dry run',default=False,action='store_true')
+cli.add_argument('-x',metavar='path',help='persistent index of input directory listings',type=str,default=None)
+cli.add_argument('-X',help='rebuild the index from -x',default=False,action='store_true')
 args=cli.parse_args(sys.argv[1:])
 
+if args.x is not None:
+  RunFileUtil.setDirIndex(os.path.expanduser(args.x),args.X)
+
 # collect the input runs/files: 
 rfgs=RunFileGroups()
 rfgs.addRuns(getRunList(args.i))
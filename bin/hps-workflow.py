@@ -23,6 +23,7 @@ cli.add_argument('--runs',     metavar='RUNS/FILE',help='(*) run numbers (e.g. "
 cli.add_argument('--inputs',   metavar='DIR/FILE',help='(*) directory to search recursively for input files, or file containing list of input files, repeatable',default=[], type=str, action='append', required=True)
 cli.add_argument('--hours',    metavar='#',help='job time request in hours (default = 2/4/24 for user/skim/evio2lcio jobs)', type=int, default=None)
 cli.add_argument('--submit',   help='submit and run workflow automatically', default=False, action='store_true')
+cli.add_argument('--compact',  help='write workflow JSON without indentation', default=False, action='store_true')
 cli.add_argument('--fileRegex',metavar='REGEX',help='input filename format for matching run and file numbers (default = %s)'%FILEREGEX, type=str, default=FILEREGEX)
 
 cli_evioskim = subclis.add_parser('evioskim',epilog='(*) = required')
@@ -185,7 +186,7 @@ if os.path.exists(workflow.name+'.json'):
 
 logger.info('Writing workflow to ./'+workflow.name+'.json')
 with open(workflow.name+'.json','w') as out:
-  out.write(workflow.getJson())
+  workflow.writeJson(out,args.compact)
 
 if args.submit:
   logger.info('Submitting %s.json with %d jobs ...\n'%(workflow.name,len(workflow.jobs)))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import os,sys,logging,argparse
+
+import ChefUtil
+import JLabTape
+import RunFileUtil
+from TapeStaging import StagingPlan
+
+logging.basicConfig(level=logging.INFO,format='%(levelname)-9s[ %(name)-15s ] %(message)s')
+logger=logging.getLogger(__name__)
+
+cli=argparse.ArgumentParser(description='Plan staging of /mss files, grouped by tape and ordered by position on tape, as batches of jcache requests.')
+cli.add_argument('-i',metavar='path',help='input files specification on /mss (directory, glob, file containing list of files), repeatable',type=str,default=[],action='append',required=True)
+cli.add_argument('-r',metavar='runs',help='run numbers (e.g. "4013" or "3980,4000-4999") or a file containing them, repeatable (default=all runs found)',type=str,default=[],action='append')
+cli.add_argument('-t',metavar='#',help='maximum number of tapes per batch (default=%(default)s)',type=int,default=4)
+cli.add_argument('-n',metavar='#',help='maximum number of files per jcache request (default=%(default)s)',type=int,default=500)
+cli.add_argument('-D',metavar='#',help='pin lifetime in days (default=%(default)s)',type=int,default=60)
+cli.add_argument('-o',metavar='path',help='output directory for one jcache script per batch',type=str,default=None)
+cli.add_argument('-j',metavar='path',help='output JSON plan file',type=str,default=None)
+cli.add_argument('--fileRegex',metavar='regex',help='input filename format, default="%s"'%RunFileUtil.getFileRegex(),type=str,default=None)
+cli.add_argument('--mss',metavar='path',help='root of the tape stubs (default=%s)'%JLabTape.MSS,type=str,default=None)
+args=cli.parse_args(sys.argv[1:])
+
+if args.mss is not None:
+  JLabTape.MSS=args.mss.rstrip('/')+'/'
+
+if args.fileRegex is not None:
+  RunFileUtil.setFileRegex(args.fileRegex)
+
+rfgs=RunFileUtil.RunFileGroups()
+if len(args.r)>0:
+  rfgs.addRuns(ChefUtil.getRunList(args.r))
+else:
+  rfgs.addRuns(RunFileUtil.getRunList(args.i))
+rfgs.findFiles(args.i)
+
+plan=StagingPlan(rfgs.getFlatList())
+
+if args.j is not None:
+  with open(args.j,'w') as f:
+    f.write(plan.toJson(args.t,args.n,args.D))
+  logger.info('Wrote JSON plan to '+args.j)
+
+if args.o is not None:
+  for x in plan.writeScripts(args.o,args.t,args.n,args.D):
+    logger.info('Wrote '+x)
+
+if args.j is None and args.o is None:
+  for i,batch in enumerate(plan.getBatches(args.t)):
+    print('# batch %d'%i)
+    for tape in batch:
+      print('\n'.join(plan.getCommands(tape,args.n,args.D)))
+
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import os,sys,logging,argparse
+
+import ChefUtil
+import RunFileUtil
+from StubIndex import StubIndex
+
+logging.basicConfig(level=logging.INFO,format='%(levelname)-9s[ %(name)-15s ] %(message)s')
+logger=logging.getLogger(__name__)
+
+cli=argparse.ArgumentParser(description='Build or query an index of /mss tape stubs (size, checksums, tape and position).')
+cli.add_argument('-i',metavar='path',help='directory of stubs to read, repeatable',type=str,default=[],action='append')
+cli.add_argument('-x',metavar='path',help='existing index file to load, repeatable',type=str,default=[],action='append')
+cli.add_argument('-o',metavar='path',help='output index file',type=str,default=None)
+cli.add_argument('-t',metavar='#',help='number of threads for reading stubs (default=%(default)s)',type=int,default=16)
+cli.add_argument('-r',metavar='runs',help='print total bytes for these run numbers (e.g. "4013" or "3980,4000-4999"), repeatable',type=str,default=[],action='append')
+cli.add_argument('-f',metavar='path',help='print the tape and position of this /mss file, repeatable',type=str,default=[],action='append')
+cli.add_argument('--tapes',help='print total bytes per tape',default=False,action='store_true')
+cli.add_argument('--fileRegex',metavar='regex',help='input filename format, default="%s"'%RunFileUtil.getFileRegex(),type=str,default=None)
+args=cli.parse_args(sys.argv[1:])
+
+if len(args.i)==0 and len(args.x)==0:
+  cli.error('Need stub directories (-i) or an index (-x)')
+
+if args.fileRegex is not None:
+  RunFileUtil.setFileRegex(args.fileRegex)
+
+index=StubIndex()
+for x in args.x:
+  index.load(x)
+for x in args.i:
+  index.addDir(x,args.t)
+
+if args.o is not None:
+  index.save(args.o)
+
+print('%d files, %.3f TB'%(len(index),index.getBytes()/1e12))
+
+if args.tapes:
+  for tape,size in sorted(index.getTapeBytes().items(),key=lambda x:str(x[0])):
+    print('%-10s %.3f TB'%(tape,size/1e12))
+
+if len(args.r)>0:
+  runs=set(ChefUtil.getRunList(args.r))
+  def select(path):
+    x=RunFileUtil.getRunFileNumber(path)
+    return x is not None and x['run'] in runs
+  print('%d runs, %.3f TB'%(len(runs),index.getBytes(select)/1e12))
+
+for x in args.f:
+  tape=index.getTape(x)
+  if tape is None:
+    print('%s not in index'%x)
+  else:
+    print('%s volser=%s bitfileIndex=%d'%(x,tape[0],tape[1]))
@@ -41,11 +41,10 @@ class CLAS12Job(SwifJob):
       basename=filename.split('/').pop()
       self.inputData.append(filename)
       if auger: self.addInput(basename,filename)
-      runno=RunFile(filename).runNumber
-      fileno=RunFile(filename).fileNumber
-      self.setRun(runno)
+      rf=RunFile(filename)
+      self.setRun(rf.runNumber)
       if self.getTag('file') is None:
-        self.addTag('file','%.5d'%fileno)
+        self.addTag('file','%.5d'%rf.fileNumber)
 
   def doReadme(self,directory):
     # put it on /cache if it's /mss:
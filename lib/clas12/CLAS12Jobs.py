@@ -28,9 +28,9 @@ class MergingJob(CLAS12Job):
     self.addTag('coatjava',cfg['coatjava'])
     self.addTag('mode','merge')
   def addInputData(self,filenames):
-    runno = RunFile(filenames[0]).runNumber
-    fileno1 = RunFile(filenames[0]).fileNumber
-    fileno2 = RunFile(filenames[len(filenames)-1]).fileNumber
+    rf1 = RunFile(filenames[0])
+    rf2 = RunFile(filenames[len(filenames)-1])
+    runno,fileno1,fileno2 = rf1.runNumber,rf1.fileNumber,rf2.fileNumber
     outBasename=self.cfg['mergePattern']%(runno,fileno1,fileno2)
     outDir='%s/merged/%.6d/'%(self.cfg['workDir'],runno)
     self.addOutputData(outBasename,outDir,'staging')
@@ -52,19 +52,21 @@ class DecodeAndMergeJob(CLAS12Job):
     self.setRam('4GB')
     self.addTag('mode','decmrg')
     self.addTag('coatjava',cfg['coatjava'])
-  def addInputData(self,eviofiles):
-    # FIXME:  this assume 2 GB EVIO file
-    self.setDisk('%.0fGB'%(int(ChefUtil.DEFAULT_EVIO_BYTES*1.4)/1e9*len(eviofiles)+1))
+  def addInputData(self,eviofiles,eviobytes=None):
+    # without real sizes, this assumes 2 GB EVIO files:
+    if eviobytes is None:
+      self.setDisk('%.0fGB'%(int(ChefUtil.DEFAULT_EVIO_BYTES*1.4)/1e9*len(eviofiles)+1))
+    else:
+      self.setDisk('%.0fGB'%(eviobytes*1.4/1e9+1))
     decodedfiles=[]
     for eviofile in eviofiles:
       CLAS12Job.addInputData(self,eviofile)
-      runno=RunFile(eviofile).runNumber
-      fileno=RunFile(eviofile).fileNumber
-      basename=self.cfg['singlePattern']%(runno,fileno)
+      rf=RunFile(eviofile)
+      basename=self.cfg['singlePattern']%(rf.runNumber,rf.fileNumber)
       decodedfiles.append(basename)
-    runno = RunFile(eviofiles[0]).runNumber
-    fileno1 = RunFile(eviofiles[0]).fileNumber
-    fileno2 = RunFile(eviofiles[len(eviofiles)-1]).fileNumber
+    rf1 = RunFile(eviofiles[0])
+    rf2 = RunFile(eviofiles[len(eviofiles)-1])
+    runno,fileno1,fileno2 = rf1.runNumber,rf1.fileNumber,rf2.fileNumber
     mergedfile=self.cfg['mergePattern']%(runno,fileno1,fileno2)
     outDir='%s/%.6d/'%(self.cfg['decDir'],runno)
     self.addOutputData(mergedfile,outDir)
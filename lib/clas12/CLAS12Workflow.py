@@ -2,8 +2,10 @@ import os,logging
 
 from SwifJob import SwifJob
 from SwifWorkflow import SwifWorkflow
+from CLAS12Job import CLAS12Job
 import CLAS12Jobs
 import ChefUtil
+import RunFileUtil
 
 _LOGGER=logging.getLogger(__name__)
 
@@ -14,6 +16,8 @@ class CLAS12Workflow(SwifWorkflow):
     self.cfg=cfg
     self.addRuns(self.cfg['runs'])
     self.findFiles(self.cfg['inputs'])
+    self.setTapeOrder(self.cfg['tapeOrder'])
+    self.setGroupBytes(self.cfg['groupBytes'])
     r=self.getRunList()
     if len(r)>0:
       self.name+='-%d'%(r[0])
@@ -49,6 +53,7 @@ class CLAS12Workflow(SwifWorkflow):
   #
   # reconclara:  add jobs for reconstrucing hipo files
   # - one job per reconSize files
+  # - or, if groupBytes is set, one job per group of files
   #
   def reconclara(self,phase,inputs):
     inps,ants,jobs=[],[],[]
@@ -58,7 +63,7 @@ class CLAS12Workflow(SwifWorkflow):
         inps.extend(inp.outputData)
       else:
         inps.append(inp)
-      if len(inps)>=self.cfg['reconSize'] or ii>=len(inputs)-1:
+      if (self.groupBytes<=0 and len(inps)>=self.cfg['reconSize']) or ii>=len(inputs)-1:
         job=CLAS12Jobs.ReconJob(self.name,self.cfg)
         job.setPhase(phase)
         if len(ants)>0:
@@ -181,8 +186,11 @@ class CLAS12Workflow(SwifWorkflow):
   #
   # decodemerge:  add jobs for decode+merge EVIO files
   # - one job per mergeSize files
+  # - or, if mergeBytes is set, one job per mergeBytes of EVIO files
   #
   def decodemerge(self,phase,inputs):
+    if self.cfg['mergeBytes']>0 and not isinstance(inputs[0],SwifJob):
+      return self._decodemergeBytes(phase,inputs)
     inps,jobs=[],[]
     for ii,inp in enumerate(inputs):
       inps.append(inp)
@@ -200,6 +208,18 @@ class CLAS12Workflow(SwifWorkflow):
         inps=[]
     return jobs
 
+  def _decodemergeBytes(self,phase,inputs):
+    jobs=[]
+    sizes=RunFileUtil.getFilesBytes(inputs)
+    sizes=dict(zip(inputs,[RunFileUtil.DEFAULT_FILE_BYTES if x is None else x for x in sizes]))
+    for inps in RunFileUtil.packBytes(inputs,[sizes[x] for x in inputs],self.cfg['mergeBytes']):
+      job=CLAS12Jobs.DecodeAndMergeJob(self.name,self.cfg)
+      job.setPhase(phase)
+      job.addInputData(inps,sum([sizes[x] for x in inps]))
+      jobs.append(job)
+      self.addJob(job)
+    return jobs
+
   #
   # decode:  add jobs for decoding evio files
   # - one job per file
@@ -241,63 +261,69 @@ class CLAS12Workflow(SwifWorkflow):
         inps=[]
     return jobs
 
+  #
+  # _cleanupChunks:  consecutive chunks of file names for delete/move jobs
+  # - at most cleanupSize files per chunk, and cleanupBytes if positive
+  # - RunFiles are accepted too, and only the first and last file of
+  #   each chunk are parsed, for the job's run and file tags
+  #
+  def _cleanupChunks(self,files):
+    fileNames=(x.fileName if isinstance(x,RunFileUtil.RunFile) else x for x in files)
+    sizes=None
+    if self.cfg['cleanupBytes']>0:
+      fileNames=list(fileNames)
+      sizes=RunFileUtil.getFilesBytes(fileNames)
+    for chunk in RunFileUtil.iterChunks(fileNames,self.cfg['cleanupSize'],self.cfg['cleanupBytes'],sizes):
+      yield chunk,RunFileUtil.RunFile(chunk[0]),RunFileUtil.RunFile(chunk[-1])
+
   #
   # delete:  add jobs to delete files from disk
-  # - one job per 200 files
+  # - one job per cleanupSize files (or cleanupBytes)
   #
   def delete(self,phase,deletes):
     jobs=[]
-    files = list(deletes)
-    while len(files)>0:
-      deletes=[]
-      while len(deletes)<200 and len(files)>0:
-        deletes.append(files.pop(0))
-      if len(deletes)>0:
-        job=CLAS12Jobs.Job(self.name,self.cfg)
-        job.setPhase(phase)
-        job.setRam('512MB')
-        job.setTime('%ds'%(60+3*len(deletes)))
-        job.setDisk('100MB')
-        job.setRun(RunFile(deletes[0]).runNumber)
-        f1=RunFile(deletes[0]).fileNumber
-        f2=RunFile(deletes[len(deletes)-1]).fileNumber
-        job.addTag('file','%.5d-%.5d'%(f1,f2))
-        job.addTag('mode','delete')
-        cmds = [ '(sleep 0.5 ; rm -f %s)'%delete for delete in deletes ]
-        job.setCmd(' ; '.join(cmds))
-        self.addJob(job)
-        jobs.append(job)
+    for deletes,first,last in self._cleanupChunks(deletes):
+      job=CLAS12Job(self.name,self.cfg)
+      job.setPhase(phase)
+      job.setRam('512MB')
+      job.setTime('%ds'%(60+3*len(deletes)))
+      job.setDisk('100MB')
+      job.setRun(first.runNumber)
+      job.addTag('file','%.5d-%.5d'%(first.fileNumber,last.fileNumber))
+      job.addTag('mode','delete')
+      cmds = [ '(sleep 0.5 ; rm -f %s)'%delete for delete in deletes ]
+      job.setCmd(' ; '.join(cmds))
+      self.addJob(job)
+      jobs.append(job)
     return jobs
 
   #
   # move:  add jobs to move files to final destination
-  # - one job per 200 files
+  # - one job per cleanupSize files (or cleanupBytes)
   #
   def move(self,phase,moves):
     jobs=[]
-    files = list(moves)
-    while len(files)>0:
-      moves=[]
-      while len(moves)<200 and len(files)>0:
-        moves.append(files.pop(0))
-      if len(moves)>0:
-        job=CLAS12Jobs.Job(self.name,self.cfg)
-        job.setPhase(phase)
-        job.setRam('512MB')
-        job.setTime('%ds'%(600+60*len(moves)))
-        job.setDisk('100MB')
-        job.setRun(RunFile(moves[0]).runNumber)
-        job.addTag('mode','move')
-        job.addTag('outDir',self.cfg['decDir'])
-        outDir='%s/%.6d'%(self.cfg['decDir'],int(job.getTag('run')))
+    outDirs=set()
+    for moves,first,last in self._cleanupChunks(moves):
+      job=CLAS12Job(self.name,self.cfg)
+      job.setPhase(phase)
+      job.setRam('512MB')
+      job.setTime('%ds'%(600+60*len(moves)))
+      job.setDisk('100MB')
+      job.setRun(first.runNumber)
+      job.addTag('mode','move')
+      job.addTag('outDir',self.cfg['decDir'])
+      outDir='%s/%.6d'%(self.cfg['decDir'],int(job.getTag('run')))
+      if outDir not in outDirs:
         ChefUtil.mkdir(outDir)
-        cmd = '(sleep 0.5 ; set d=%s ; touch -c $d ; rsync $d %s/ ; rsync $d %s/ && rm -f $d)'
-        cmds = [ cmd%(move,outDir,outDir) for move in moves ]
-        job.setCmd(' ; '.join(cmds)+' ; true')
-        for move in moves:
-          job.outputData.append('%s/%s'%(outDir,os.path.basename(move)))
-        self.addJob(job)
-        jobs.append(job)
+        outDirs.add(outDir)
+      cmd = '(sleep 0.5 ; set d=%s ; touch -c $d ; rsync $d %s/ ; rsync $d %s/ && rm -f $d)'
+      cmds = [ cmd%(move,outDir,outDir) for move in moves ]
+      job.setCmd(' ; '.join(cmds)+' ; true')
+      for move in moves:
+        job.outputData.append('%s/%s'%(outDir,os.path.basename(move)))
+      self.addJob(job)
+      jobs.append(job)
     return jobs
 
   #
@@ -313,8 +339,9 @@ class CLAS12Workflow(SwifWorkflow):
 
     for hipoFileName in hipoFiles:
 
-      runno = RunFile(hipoFileName).runNumber
-      fileno = RunFile(hipoFileName).fileNumber
+      runFile = RunFileUtil.RunFile(hipoFileName)
+      runno = runFile.runNumber
+      fileno = runFile.fileNumber
       reconBaseName = os.path.basename(hipoFileName).replace('.hipo','.recon.hipo')
 
       nFiles = 1
@@ -1,4 +1,4 @@
-import logging
+import logging,collections
 
 from SwifWorkflow import SwifPhase
 from CLAS12Workflow import CLAS12Workflow
@@ -121,10 +121,10 @@ class RollingRuns(CLAS12Workflow):
     _LOGGER.info('Generating a RollingRuns workflow')
 
     # master-queue:
-    queue=self.getGroups()
+    queue=collections.deque(self.getGroups())
 
     # sub-queues:
-    decodeQ,mergeQ,reconQ,trainQ=[],[],[],[]
+    decodeQ,mergeQ,reconQ,trainQ=[collections.deque() for x in range(4)]
 
     nruns,nfiles = 0,0
 
@@ -133,7 +133,7 @@ class RollingRuns(CLAS12Workflow):
       jput_jobs = []
 
       if len(trainQ)>0:
-        xx = trainQ.pop(0)
+        xx = trainQ.popleft()
         trainJobs = self.train(xx.phase,xx.jobs)
         if not self.cfg['nomerge']:
           trainJobs.extend(self.trainmerge(xx.phase,trainJobs))
@@ -141,14 +141,14 @@ class RollingRuns(CLAS12Workflow):
           self.trainclean(xx.phase,trainJobs)
 
       if len(reconQ)>0:
-        xx = reconQ.pop(0)
+        xx = reconQ.popleft()
         reconJobs=self.reconclara(xx.phase,xx.jobs)
         jput_jobs.extend(reconJobs)
         if self.cfg['model'].find('ana')>=0:
           trainQ.append(SwifPhase(xx.phase+1,reconJobs))
 
       if len(decodeQ)>0:
-        xx = decodeQ.pop(0)
+        xx = decodeQ.popleft()
         if self.cfg['model'].find('mrg')>=0:
           decodeJobs = self.decodemerge(xx.phase,xx.jobs)
         else:
@@ -159,7 +159,7 @@ class RollingRuns(CLAS12Workflow):
 
       if len(queue)>0:
 
-        files = queue.pop(0)
+        files = queue.popleft()
         nruns += 1
         nfiles += len(files)
 
@@ -199,9 +199,13 @@ class ChefConfig(collections.OrderedDict):
 
     cli.add_argument('--phaseSize', metavar='#',help='number of files (or runs if less than 100) per phase, while negative is unphased', type=int, default=None)
     cli.add_argument('--mergeSize', metavar='#',help='number of decoded files per merge', type=int, default=None)
+    cli.add_argument('--mergeBytes', metavar='#',help='EVIO bytes per decode+merge job, packed using real file sizes and overriding mergeSize (e.g. 1e10)', type=float, default=None)
     cli.add_argument('--trainSize', metavar='#',help='number of files per train job', type=int, default=None)
+    cli.add_argument('--cleanupSize', metavar='#',help='number of files per delete/move job', type=int, default=None)
+    cli.add_argument('--cleanupBytes', metavar='#',help='bytes per delete/move job, packed using real file sizes and still limited by cleanupSize (e.g. 1e12)', type=float, default=None)
 
     cli.add_argument('--reconSize', metavar='#',help='number of files per recon job', type=int, default=None)
+    cli.add_argument('--groupBytes', metavar='#',help='input bytes per group of files from one run, packed using real file sizes, with one recon job per group overriding reconSize (e.g. 2e10)', type=float, default=None)
 
     cli.add_argument('--denoise', help='enable DC denoising', default=False, action='store_true')
     cli.add_argument('--nopostproc', help='disable post-processing of helicity and beam charge', action='store_true', default=None)
@@ -215,8 +219,12 @@ class ChefConfig(collections.OrderedDict):
     cli.add_argument('--torus',    metavar='#.#',help='override RCDB torus scale',   type=float, default=None)
     cli.add_argument('--solenoid', metavar='#.#',help='override RCDB solenoid scale',type=float, default=None)
 
-    cli.add_argument('--fileRegex',metavar='REGEX',help='input filename format for matching run and file numbers, default="%s"'%CFG['fileRegex'], type=str, default=None)
+    cli.add_argument('--fileRegex',metavar='REGEX',help='input filename format for matching run and file numbers, default="%s".  This option is repeatable, the first matching regex is used.'%CFG['fileRegex'], action='append', type=str, default=[])
     cli.add_argument('--forties', help='set --fileRegex for files in the 40s', default=False, action='store_true')
+    cli.add_argument('--dirIndex',metavar='PATH',help='enable a persistent index of input directory listings in this sqlite file, preferably on local disk (default=disabled)', type=str, default=None)
+    cli.add_argument('--noindex', help='bypass the input directory index, e.g. from a --config file', default=False, action='store_true')
+    cli.add_argument('--reindex', help='rebuild the input directory index', default=False, action='store_true')
+    cli.add_argument('--tapeOrder', help='order input files by tape and position on tape, to minimize tape mounts', default=False, action='store_true')
     cli.add_argument('--graalvm', help='use GraalVM instead of JVM', default=False, action='store_true')
 
     cli.add_argument('--lowpriority',help='run with non-priority fairshare', default=False, action='store_true')
@@ -228,6 +236,11 @@ class ChefConfig(collections.OrderedDict):
     cli.add_argument('--defaults',help='print default config file and exit', action='store_true', default=False)
     cli.add_argument('--show',    help='print config file and exit', action='store_true', default=False)
     cli.add_argument('--submit', help='submit and run jobs immediately', action='store_true', default=False)
+    cli.add_argument('--compact', help='write workflow JSON without indentation', action='store_true', default=False)
+    cli.add_argument('--envScript', help='write the environment setup shared by all jobs to a script next to the JSON file (must be readable from the batch farm), instead of repeating it in every job', action='store_true', default=False)
+    cli.add_argument('--shardSize', metavar='#',help='with --submit, split jobs into shards of at most this many jobs from one phase, import the first and add the rest with swif2 add-job, concurrently where antecedents allow (0 = one import)', type=int, default=None)
+    cli.add_argument('--profile', metavar='PATH',help='write wall-clock time of each stage and call counts and time of expensive helpers (RCDB, YAML/jar checks, hipo-utils, mkdir, README, JSON) to this JSON file, and log a summary', type=str, default=None)
+    cli.add_argument('--cprofile', metavar='PATH',help='also write cProfile statistics to this file (see python -m pstats)', type=str, default=None)
     cli.add_argument('--hattawy', help='rigorous, slow disk request calculation', action='store_true', default=False)
     cli.add_argument('--version',action='version',version='clas12-workflow/0.99')
 
@@ -289,6 +302,9 @@ class ChefConfig(collections.OrderedDict):
     if self['tag'] is None:
       self.cli.error('"tag" must be specified.')
 
+    if isinstance(self['fileRegex'],list) and len(self['fileRegex'])==1:
+      self['fileRegex'] = self['fileRegex'][0]
+
     if self['forties']:
       self['fileRegex'] = '.*clas[_A-Za-z]*_(\d+)\.evio\.(0004\d+)'
 
@@ -317,10 +333,15 @@ class ChefConfig(collections.OrderedDict):
 
     # print ignoring decoding-specific parameters:
     if self['model'].find('dec')<0:
-      for x in 'mergeSize','decDir','torus','solenoid':
+      for x in 'mergeSize','mergeBytes','decDir','torus','solenoid':
         if self[x] != CFG[x]:
           _LOGGER.warning('Ignoring --%s option since not decoding.'%x)
 
+    # print ignoring the recon file count:
+    if self['groupBytes']>0 and self['model'].find('rec')>=0:
+      if self['reconSize'] != CFG['reconSize']:
+        _LOGGER.warning('Ignoring --reconSize option since grouping by --groupBytes.')
+
     # print ignoring train-specific parameters:
     if self['model'].find('ana')<0:
       for x in 'trainSize','trainDir','trainYaml':
@@ -382,6 +403,9 @@ class ChefConfig(collections.OrderedDict):
     if self['reconSize']<1:
       self.cli.error('Invalid reconSize:  '+str(self['reconSize']))
 
+    if self['cleanupSize']<1:
+      self.cli.error('Invalid cleanupSize:  '+str(self['cleanupSize']))
+
     # before switchingn to run-phasing, phaseSize of 0 meant 1 run per phase,
     # swap it here to keep that meaning the same:
     if self['phaseSize']==0:
@@ -399,6 +423,10 @@ class ChefConfig(collections.OrderedDict):
     if self['model'].find('mrg')>=0 and self['fileRegex']!=RunFileUtil.getFileRegex():
       self.cli.error('Non-default "fileRegex" is not allowed in merging workflows.')
 
+    # merging requires consecutive file numbers, not tape order:
+    if self['model'].find('mrg')>=0 and self['tapeOrder']:
+      self.cli.error('"tapeOrder" is not allowed in merging workflows.')
+
     if self['model'].find('qtl')<0 and self['physics']:
       _LOGGER.info('Ignoring --physics since not a qtl workflow')
 
@@ -419,6 +447,10 @@ class ChefConfig(collections.OrderedDict):
     if self['fileRegex'] != RunFileUtil.getFileRegex():
       RunFileUtil.setFileRegex(self['fileRegex'])
 
+    # use the input directory index, unless bypassed:
+    if not self['noindex'] and self['dirIndex'] is not None:
+      RunFileUtil.setDirIndex(os.path.expanduser(self['dirIndex']),self['reindex'])
+
     # check sqlite file:
     if self['ccdbsqlite'] is not None:
       self['ccdbsqlite'] = os.path.abspath(self['ccdbsqlite'])
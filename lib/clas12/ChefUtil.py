@@ -2,6 +2,7 @@ import os,re,sys,subprocess,logging
 
 from RcdbManager import RcdbManager
 import ClaraYaml
+import JLabTape
 
 _RCDB=None
 _LOGGER=logging.getLogger(__name__)
@@ -12,7 +13,7 @@ DEFAULT_DST_BYTES=1.5e9   # from five 2GB EVIO files
 DEFAULT_RECON_TIME=1.5    # seconds per event
 DEFAULT_EVENTS=5*7e4      # events in a file
 
-_DIRSMADE=[]
+_DIRSMADE=set()
 def mkdir(path,tag=None):
   if path.startswith('/mss') or path.startswith('/cache'):
     return
@@ -23,7 +24,7 @@ def mkdir(path,tag=None):
       _LOGGER.info('Making output directory: '+path)
     else:
       _LOGGER.info('Making '+tag+' directory: '+path)
-    _DIRSMADE.append(path)
+    _DIRSMADE.add(path)
   if path is not None and not path.startswith('/mss'):
     if os.access(path,os.F_OK):
       if not os.access(path,os.W_OK):
@@ -38,15 +39,7 @@ def mkdir(path,tag=None):
         sys.exit(1)
 
 def getFileBytes(path):
-  if os.path.isfile(path):
-    if path.startswith('/mss'):
-      for line in open(path,'r').readlines():
-        cols=line.strip().split('=')
-        if len(cols)==2 and cols[0]=='size':
-          return int(cols[1])
-    else:
-      return os.path.getsize(path)
-  return None
+  return JLabTape.getFileBytes(path)
 
 def getReconFileBytes(schema,decodedfile):
   if schema is not None and schema.startswith('/'):
@@ -1,9 +1,24 @@
-import os,sys,json,getpass,logging,collections
+import os,sys,json,shlex,getpass,logging,collections
 
 from SwifStatus import SWIF
 
 CONSTRAINTS=['el9','el7','farm23','farm19','farm18','farm16']
 
+class Antecedents():
+  ''' job names, unique and in insertion order, with list-like append/extend '''
+  def __init__(self):
+    self._names={}
+  def append(self,name):
+    self._names[name]=None
+  def extend(self,names):
+    for x in names: self.append(x)
+  def __contains__(self,name):
+    return name in self._names
+  def __iter__(self):
+    return iter(self._names)
+  def __len__(self):
+    return len(self._names)
+
 class SwifJob:
 
   __JSONFORMAT={'indent':2,'separators':(',',': ')}
@@ -23,7 +38,7 @@ class SwifJob:
     self.ram='1GB'
     self.shell='/bin/tcsh'
     self.tags=collections.OrderedDict()
-    self.antecedents=[]
+    self.antecedents=Antecedents()
     self.conditions=[]
     self.logDir='/farm_out/'+getpass.getuser()
     self.cmd=''
@@ -34,6 +49,17 @@ class SwifJob:
     self.inputData=[]
     self.outputData=[]
     self.copyInputs=True
+    # a script shared by many jobs, holding the start of their command:
+    self.preamble=None
+    self.preambleEnv=0
+    # serialized forms, rebuilt only after a setter changes the job:
+    self._command=None
+    self._json=None
+    self._jsonKey=None
+
+  def _changed(self):
+    self._command=None
+    self._json=None
 
   def __str__(self):
     s = 'Phase %d : %s'%(self.phase,self.getJobName())
@@ -44,18 +70,22 @@ class SwifJob:
 
   def addEnv(self,name,value):
     self.env.append({'name':name,'value':value})
+    self._changed()
 
   def setPartition(self,partition):
     self.partition=partition
+    self._changed()
 
   def getCores(self):
     return self.cores
 
   def setCores(self,cores):
     self.cores=cores
+    self._changed()
 
   def setNumber(self,number):
     self.number=number
+    self._changed()
 
   def addTag(self,key,val):
     if key in self.tags:
@@ -65,6 +95,7 @@ class SwifJob:
         self.tags[key]={self.tags[key],val}
     else:
       self.tags[key]=val
+    self._changed()
 
   def getTag(self,key):
     if key in self.tags: return self.tags[key]
@@ -74,24 +105,37 @@ class SwifJob:
     if not phase is None and not type(phase) is int:
       raise ValueError('phase must be None or an integer.')
     self.phase=phase
+    self._changed()
 
   def setDisk(self,disk):
     self.disk=disk
+    self._changed()
 
   def setRam(self,ram):
     self.ram=ram
+    self._changed()
 
   def setTime(self,time):
     self.time=time
+    self._changed()
 
   def setCmd(self,cmd):
     self.cmd=cmd
+    self._changed()
 
   def setShell(self,shell):
     self.shell=shell
+    self._changed()
 
   def setLogDir(self,logDir):
     self.logDir=logDir
+    self._changed()
+
+  def setPreamble(self,path,nenv):
+    # the script at path does _getPreamble(nenv), see SwifWorkflow.writeEnvScripts
+    self.preamble=path
+    self.preambleEnv=nenv
+    self._changed()
 
   def isGlob(self,path):
     for x in ['*','?','[',']']:
@@ -108,6 +152,7 @@ class SwifJob:
     io.append({'local':local,'remote':remote})
     if self.isGlob(local):
       io[len(io)-1]['wildcard'] = True
+    self._changed()
 
   def addInput(self,local,remote):
     self._addIO(self.inputs,local,remote)
@@ -227,7 +272,22 @@ class SwifJob:
     else:
       return ''
 
-  def _createCommand(self):
+  def _createCommand(self,cache=True):
+    # with cache=False, a command that isn't already cached isn't kept:
+    if self._command is not None:
+      return self._command
+    cmd=self._buildCommand()
+    if cache:
+      self._command=cmd
+    return cmd
+
+  def _setEnvCmd(self,x):
+    if self.shell.endswith('csh'):
+      return ' && setenv %s "%s"'%(x['name'],x['value'])
+    else:
+      return ' && export %s="%s"'%(x['name'],x['value'])
+
+  def _getPreamble(self,nenv):
     cmd='unalias -a ; '
     if self.shell.endswith('tcsh'):
       cmd+='set echo; '
@@ -237,11 +297,17 @@ class SwifJob:
     cmd+='env | egrep -e SWIF -e SLURM ;'
     cmd+='echo $PWD ; pwd ;'
     cmd+='expr $PWD : ^/scratch/slurm'
-    for x in self.env:
-      if self.shell.endswith('csh'):
-        cmd+=' && setenv %s "%s"'%(x['name'],x['value'])
-      else:
-        cmd+=' && export %s="%s"'%(x['name'],x['value'])
+    for x in self.env[:nenv]:
+      cmd+=self._setEnvCmd(x)
+    return cmd
+
+  def _buildCommand(self):
+    if self.preamble is None:
+      cmd=self._getPreamble(len(self.env))
+    else:
+      cmd='source '+self.preamble
+      for x in self.env[self.preambleEnv:]:
+        cmd+=self._setEnvCmd(x)
     if self.copyInputs:
       cmd+=' && '+self._getCopyInputsCmd()
     dirs=[]
@@ -258,7 +324,19 @@ class SwifJob:
       logging.getLogger(__name__).critical('Command might be too long:\n '+cmd)
     return cmd
 
-  def toJson(self):
+  def toJson(self,cache=True):
+    # antecedents and conditions are often appended to directly.  With
+    # cache=False, e.g. when writing many jobs once, nothing new is kept:
+    key=(len(self.antecedents),len(self.conditions))
+    if self._json is not None and self._jsonKey==key:
+      return self._json
+    jsonData=self._buildJson(cache)
+    if cache:
+      self._json=jsonData
+      self._jsonKey=key
+    return jsonData
+
+  def _buildJson(self,cache=True):
     jsonData = collections.OrderedDict()
     jsonData['constraint']=self.os
     jsonData['name']=self.getJobName()
@@ -274,7 +352,7 @@ class SwifJob:
       jsonData['ram_bytes']=0
     jsonData['disk_bytes']=self.getBytes(self.disk)
     jsonData['time_secs']=self.getSeconds(self.time)
-    jsonData['command']=[self._createCommand()]
+    jsonData['command']=[self._createCommand(cache)]
     if len(self.tags)>0:
       jsonData['tags']=[]
       for k,v in list(self.tags.items()):
@@ -283,7 +361,7 @@ class SwifJob:
         else:
           jsonData['tags'].append({'name':k,'value':v})
     if len(self.antecedents)>0:
-      jsonData['antecedents']=self.antecedents
+      jsonData['antecedents']=list(self.antecedents)
     if len(self.conditions)>0:
       jsonData['conditions']=self.conditions
     if len(self.inputs)>0:
@@ -298,6 +376,41 @@ class SwifJob:
   def getJson(self):
     return json.dumps(self.toJson(),**SwifJob.__JSONFORMAT)
 
+  def _checkAddJob(self):
+    # conditions and wildcards have no add-job options:
+    if len(self.conditions)>0:
+      raise ValueError('Job with conditions cannot use add-job:  '+self.getJobName())
+    if any([x.get('wildcard') for x in self.inputs+self.outputs]):
+      raise ValueError('Job with wildcards cannot use add-job:  '+self.getJobName())
+
+  def getAddJob(self):
+    # the swif2 add-job command for this job, equivalent to its JSON for
+    # swif2 import:
+    self._checkAddJob()
+    cmd=[SWIF,'add-job','-workflow',self.workflow,'-name',self.getJobName(),'-phase',str(self.phase)]
+    cmd.extend(['-account',self.account,'-partition',self.partition,'-constraint',self.os,'-shell',self.shell])
+    if self.cores > 0:
+      cmd.extend(['-cores',str(self.cores),'-ram',self.ram])
+    else:
+      cmd.append('-exclusive')
+    cmd.extend(['-disk',self.disk,'-time',self.time])
+    for k,v in list(self.tags.items()):
+      for w in (v if isinstance(v,set) else [v]):
+        cmd.extend(['-tag',k,str(w)])
+    for x in self.antecedents:
+      cmd.extend(['-antecedent',x])
+    for x in self.inputs:
+      cmd.extend(['-input',x['local'],x['remote']])
+    for x in self.outputs:
+      cmd.extend(['-output',x['local'],x['remote']])
+    if self.logDir is not None:
+      cmd.extend(['-stdout',self.getLogPrefix()+'.out','-stderr',self.getLogPrefix()+'.err'])
+    cmd.append(self._createCommand(False))
+    return cmd
+
+  def getShell(self):
+    return ' '.join([shlex.quote(x) for x in self.getAddJob()])
+
 class JputJob(SwifJob):
   def __init__(self,workflow):
     SwifJob.__init__(self,workflow)
@@ -306,15 +419,15 @@ class JputJob(SwifJob):
     self.ram='500MB'
     self.addTag('mode','jput')
     self.jputfiles = []
+    self._jputfiles = set()
   def addJputs(self,jobs):
     for j in jobs:
-      if 'output' in j.toJson():
-        for o in j.toJson()['output']:
-          if o['remote'].startswith('file:/cache'):
-            if (j.getJobName()) not in self.antecedents:
-              self.antecedents.append(j.getJobName())
-            if o['remote'][5:] not in self.jputfiles:
-              self.jputfiles.append(o['remote'][5:])
+      for o in j.outputs:
+        if o['remote'].startswith('file:/cache'):
+          self.antecedents.append(j.getJobName())
+          if o['remote'][5:] not in self._jputfiles:
+            self._jputfiles.add(o['remote'][5:])
+            self.jputfiles.append(o['remote'][5:])
     cmd = '/site/bin/jcache put ' + ' '.join(self.jputfiles)
     SwifJob.setCmd(self,cmd)
 
@@ -1,7 +1,8 @@
 import os,sys,glob,json,copy,subprocess,getpass,datetime,collections
 import FileUtil
 
-SWIF='/usr/bin/swif2'
+# overridable, e.g. with a fake swif2 for testing:
+SWIF=os.environ.get('SWIF2','/usr/bin/swif2')
 
 _JSONFORMAT={'indent':2,'separators':(',',': '),'sort_keys':True}
 
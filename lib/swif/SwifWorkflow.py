@@ -1,8 +1,11 @@
-import tempfile,subprocess,collections,json
+import io,os,time,logging,tempfile,subprocess,collections,json
+from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
 from RunFileUtil import RunFileGroups
 from SwifJob import SwifJob
 from SwifStatus import SWIF,SwifStatus
 
+_LOGGER=logging.getLogger(__name__)
+
 class SwifWorkflow(RunFileGroups):
 
   def __init__(self,name):
@@ -10,6 +13,10 @@ class SwifWorkflow(RunFileGroups):
     self.setPhaseSize(0)
     self.name=name
     self.jobs=[]
+    # name/phase indexes of jobs, updated lazily from self.jobs:
+    self._indexed=0
+    self._jobsByName={}
+    self._jobsByPhase={}
     self.phase=0
     # new for swif2:
     self.maxConcurrent=int(1e4)
@@ -23,6 +30,7 @@ class SwifWorkflow(RunFileGroups):
   def addJob(self,job):
     if isinstance(job,list):
       for j in job: self.addJob(j)
+      return
     if not isinstance(job,SwifJob):
       raise TypeError('Must be a SwifJob')
     job.setNumber(len(self.jobs)+1)
@@ -31,12 +39,20 @@ class SwifWorkflow(RunFileGroups):
   def setPhaseSize(self,phaseSize):
     RunFileGroups.setGroupSize(self,phaseSize)
 
+  def _index(self):
+    # jobs are indexed on the first lookup after being added:
+    for job in self.jobs[self._indexed:]:
+      self._jobsByName[job.getJobName()]=job
+      self._jobsByPhase.setdefault(job.phase,[]).append(job)
+    self._indexed=len(self.jobs)
+
+  def getJob(self,name):
+    self._index()
+    return self._jobsByName.get(name)
+
   def getJobs(self,phase):
-    jobs=[]
-    for job in self.jobs:
-      if job.phase == phase:
-        jobs.append(job)
-    return jobs
+    self._index()
+    return list(self._jobsByPhase.get(phase,[]))
 
   def getShell(self):
     ret=[]
@@ -47,23 +63,188 @@ class SwifWorkflow(RunFileGroups):
       ret.append(job.getShell())
     return '\n'.join(ret)
 
-  def getJson(self):
+  def writeJson(self,out,compact=False,jobs=None):
+    # jobs are serialized and written one at a time, without keeping
+    # their serialized forms, so the output never has to fit in memory:
+    if jobs is None:
+      jobs = self.jobs
     data = collections.OrderedDict()
     data['name'] = self.name
     data['site'] = self.site
     data['max_dispatched'] = self.maxConcurrent
-    data['jobs']=[job.toJson() for job in self.jobs]
-    return json.dumps(data,**{'indent':2,'separators':(',',': ')})
+    if compact:
+      out.write(json.dumps(data,separators=(',',':'))[:-1]+',"jobs":[')
+      for ii,job in enumerate(jobs):
+        if ii>0:
+          out.write(',')
+        out.write(json.dumps(job.toJson(False),separators=(',',':')))
+      out.write(']}')
+    else:
+      out.write(json.dumps(data,indent=2,separators=(',',': '))[:-2]+',\n  "jobs": [')
+      for ii,job in enumerate(jobs):
+        if ii>0:
+          out.write(',')
+        # nested two levels deep:
+        out.write('\n    '+json.dumps(job.toJson(False),indent=2,separators=(',',': ')).replace('\n','\n    '))
+      out.write('\n  ]\n}' if len(jobs)>0 else ']\n}')
+
+  def getJson(self,compact=False):
+    out = io.StringIO()
+    self.writeJson(out,compact)
+    return out.getvalue()
 
   def submitShell(self):
     for cmd in self.getShell():
       print((subprocess.check_output(cmd)))
 
-  def submitJson(self):
-    with tempfile.NamedTemporaryFile(mode='w') as jsonFile:
-      jsonFile.write(self.getJson())
-      jsonFile.flush()
-      print((subprocess.check_output([SWIF,'import','-file',jsonFile.name])))
+  def _getEnvGroups(self,directory):
+    # Group jobs by shell and log directory, with the number of leading
+    # environment variables they share and the path of their script:
+    groups=collections.OrderedDict()
+    for job in self.jobs:
+      groups.setdefault((job.shell,job.logDir),[]).append(job)
+    ret=[]
+    for ii,((shell,logDir),jobs) in enumerate(groups.items()):
+      env=jobs[0].env
+      nenv=0
+      while nenv<len(env) and all([len(j.env)>nenv and j.env[nenv]==env[nenv] for j in jobs]):
+        nenv+=1
+      name=self.name if len(groups)==1 else '%s-%d'%(self.name,ii)
+      path='%s/%s.%s'%(os.path.abspath(directory),name,'csh' if shell.endswith('csh') else 'sh')
+      ret.append((path,nenv,jobs))
+    return ret
+
+  def getEnvScripts(self,directory):
+    # the paths writeEnvScripts would write:
+    return [x[0] for x in self._getEnvGroups(directory)]
+
+  def writeEnvScripts(self,directory):
+    # Move the start of job commands, shared by jobs with the same shell and
+    # log directory, including their common leading environment variables,
+    # into one script per group that the jobs source instead:
+    paths=[]
+    for path,nenv,jobs in self._getEnvGroups(directory):
+      # never overwrite, it may be in use by another workflow:
+      with open(path,'x') as f:
+        f.write(jobs[0]._getPreamble(nenv)+'\n')
+      for job in jobs:
+        job.setPreamble(path,nenv)
+      _LOGGER.info('Wrote environment script for %d jobs to %s'%(len(jobs),path))
+      paths.append(path)
+    return paths
+
+  def getShards(self,shardSize):
+    # jobs in the same phase, in order, at most shardSize per shard.  Jobs
+    # are grouped by phase even if not consecutive, e.g. with RollingRuns:
+    self._index()
+    shards=[]
+    for phase in sorted(self._jobsByPhase):
+      jobs=self._jobsByPhase[phase]
+      for ii in range(0,len(jobs),shardSize):
+        shards.append(jobs[ii:ii+shardSize])
+    return shards
+
+  def _getImportedJobNames(self):
+    # names of jobs already in the workflow, none if it doesn't exist yet:
+    try:
+      details=SwifStatus(self.name).getDetails()
+    except subprocess.CalledProcessError:
+      return set()
+    return set([x['name'] for x in details.get('jobs',[]) if 'name' in x])
+
+  def _importShard(self,jobs,retries):
+    for attempt in range(retries+1):
+      # a failed import may have been partial, so only retry the jobs swif2
+      # doesn't already have:
+      if attempt>0 and len(jobs)>0:
+        imported=self._getImportedJobNames()
+        jobs=[x for x in jobs if x.getJobName() not in imported]
+        if len(jobs)==0:
+          return None
+      label='%d jobs starting with %s'%(len(jobs),jobs[0].getJobName()) if len(jobs)>0 else 'empty workflow'
+      with tempfile.NamedTemporaryFile(mode='w',suffix='.json') as jsonFile:
+        self.writeJson(jsonFile,True,jobs)
+        jsonFile.flush()
+        try:
+          return subprocess.check_output([SWIF,'import','-file',jsonFile.name],stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+          if attempt>=retries:
+            _LOGGER.critical('Failed importing %s:\n%s'%(label,e.output.decode('UTF-8')))
+            raise
+          _LOGGER.warning('Retrying import of '+label)
+          time.sleep(2**attempt)
+
+  def _addShard(self,jobs,retries):
+    # add jobs one at a time, so the antecedents of each are already there:
+    for job in jobs:
+      for attempt in range(retries+1):
+        # a failed add-job may still have added the job:
+        if attempt>0:
+          if job.getJobName() in self._getImportedJobNames():
+            break
+          _LOGGER.warning('Retrying add-job of '+job.getJobName())
+        try:
+          subprocess.check_output(job.getAddJob(),stderr=subprocess.STDOUT)
+          break
+        except subprocess.CalledProcessError as e:
+          if attempt>=retries:
+            _LOGGER.critical('Failed adding %s:\n%s'%(job.getJobName(),e.output.decode('UTF-8')))
+            raise
+          time.sleep(2**attempt)
+
+  def submitJson(self,shardSize=0,threads=4,retries=3):
+    # With shardSize>0, jobs are submitted in shards of one phase each.  The
+    # first shard is imported and creates the workflow, and the others are
+    # added with swif2 add-job, concurrently once all shards containing their
+    # antecedents have been added.  The add-job options follow swif2's
+    # command line documentation, but unlike import are untested with
+    # a real swif2 here.
+    if shardSize>0:
+      shards=self.getShards(shardSize)
+      # fail before submitting anything:
+      for shard in shards[1:]:
+        for job in shard:
+          job._checkAddJob()
+    else:
+      shards=[self.jobs]
+    # an empty workflow is still created:
+    if len(shards)==0:
+      shards=[[]]
+    shardOf={}
+    for ii,shard in enumerate(shards):
+      for job in shard:
+        shardOf[job.number]=ii
+    # swif2 would reject the import of a job with an unknown antecedent,
+    # possibly after earlier shards were imported, so check them first:
+    deps=[]
+    for ii,shard in enumerate(shards):
+      deps.append(set())
+      for job in shard:
+        for x in job.antecedents:
+          antecedent=self.getJob(x)
+          if antecedent is None:
+            raise ValueError('Unknown antecedent %s of job %s'%(x,job.getJobName()))
+          deps[-1].add(shardOf[antecedent.number])
+      deps[-1].discard(ii)
+    if len(deps[0])>0:
+      raise ValueError('First shard has antecedents in later shards:  '+str(sorted(deps[0])))
+    output=self._importShard(shards[0],retries)
+    if output is not None:
+      print(output)
+    done,todo,pending={0},list(range(1,len(shards))),{}
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+      while len(todo)>0 or len(pending)>0:
+        for ii in [x for x in todo if deps[x]<=done]:
+          pending[pool.submit(self._addShard,shards[ii],retries)]=ii
+          todo.remove(ii)
+        if len(pending)==0:
+          raise ValueError('Unresolvable antecedents between shards:  '+str(todo))
+        finished,_=wait(pending,return_when=FIRST_COMPLETED)
+        for f in finished:
+          ii=pending.pop(f)
+          f.result()
+          done.add(ii)
+          _LOGGER.info('Added shard %d/%d with %d jobs'%(len(done),len(shards),len(shards[ii])))
     print((subprocess.check_output([SWIF,'run','-workflow',self.name])))
     # sometimes SWIF's not ready yet, so don't do this:
     #print((subprocess.check_output([SWIF,'status','-workflow',self.name])))
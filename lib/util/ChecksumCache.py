@@ -0,0 +1,91 @@
+import os,sqlite3,logging,urllib.parse
+
+_LOGGER=logging.getLogger(__name__)
+
+class ChecksumCache():
+  '''
+  persistent md5/crc32 of files, valid while path, inode, size and mtime are unchanged
+
+  Only the process that opened the cache writes to it.  Other processes,
+  e.g. the workers of a process pool, read it through a read-only connection
+  and queue their new checksums, for the owner to write with putRows.
+  '''
+
+  def __init__(self,path):
+    self.path=path
+    self.db=None
+    self.pid=None
+    self.owner=os.getpid()
+    self.pending=[]
+    d=os.path.dirname(self.path)
+    if len(d)>0 and not os.path.isdir(d):
+      os.makedirs(d)
+    self._connect()
+
+  def _connect(self):
+    # a connection must not be shared across fork, e.g. with a process pool.
+    # The rollback journal is used (and restored, since WAL mode persists in
+    # the file), because WAL does not work on network filesystems like $HOME:
+    if self.pid!=os.getpid():
+      if os.getpid()==self.owner:
+        self.db=sqlite3.connect(self.path,timeout=600)
+        self.db.execute('PRAGMA journal_mode=DELETE')
+        self.db.execute('CREATE TABLE IF NOT EXISTS sums (path TEXT PRIMARY KEY, inode INTEGER, size INTEGER, mtime INTEGER, md5 TEXT, crc32 TEXT)')
+        self.db.commit()
+      else:
+        self.db=sqlite3.connect('file:'+urllib.parse.quote(os.path.abspath(self.path))+'?mode=ro',timeout=600,uri=True)
+        self.pending=[]
+      self.pid=os.getpid()
+    return self.db
+
+  def get(self,path,st):
+    # return (md5,crc32) if the file is unchanged since cached, else (None,None):
+    row=self._connect().execute('SELECT inode,size,mtime,md5,crc32 FROM sums WHERE path=?',(path,)).fetchone()
+    if row is None or row[:3]!=(st.st_ino,st.st_size,st.st_mtime_ns):
+      return None,None
+    return row[3],row[4]
+
+  def put(self,path,st,md5,crc32):
+    # checksums not given are kept if the file is unchanged:
+    row=(path,st.st_ino,st.st_size,st.st_mtime_ns,md5,crc32)
+    if os.getpid()!=self.owner:
+      self.pending.append(row)
+    else:
+      self.putRows([row])
+
+  def popPending(self):
+    # rows queued by put in a non-owner process, for the owner's putRows:
+    rows,self.pending=self.pending,[]
+    return rows
+
+  def putRows(self,rows):
+    # (path,inode,size,mtime,md5,crc32) rows, in the owner process:
+    if os.getpid()!=self.owner:
+      raise RuntimeError('checksum cache is only written by its owner process')
+    with self._connect() as db:
+      for path,inode,size,mtime,md5,crc32 in rows:
+        old=db.execute('SELECT inode,size,mtime,md5,crc32 FROM sums WHERE path=?',(path,)).fetchone()
+        if old is not None and old[:3]==(inode,size,mtime):
+          md5=old[3] if md5 is None else md5
+          crc32=old[4] if crc32 is None else crc32
+        db.execute('INSERT OR REPLACE INTO sums VALUES (?,?,?,?,?,?)',(path,inode,size,mtime,md5,crc32))
+
+  def evict(self,prefix=''):
+    # remove entries for files that no longer exist, at or under prefix:
+    db=self._connect()
+    prefix=prefix.rstrip('/')
+    if len(prefix)==0:
+      rows=db.execute('SELECT path FROM sums')
+    else:
+      rows=db.execute('SELECT path FROM sums WHERE path=? OR substr(path,1,?)=?',(prefix,len(prefix)+1,prefix+'/'))
+    gone=[(x,) for x, in rows if not os.path.isfile(x)]
+    with db:
+      db.executemany('DELETE FROM sums WHERE path=?',gone)
+    _LOGGER.info('Evicted %d missing files from checksum cache %s'%(len(gone),self.path))
+    return len(gone)
+
+  def close(self):
+    if self.db is not None and self.pid==os.getpid():
+      self.db.close()
+    self.db=None
+    self.pid=None
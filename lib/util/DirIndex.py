@@ -0,0 +1,136 @@
+import os,re,time,sqlite3,logging,threading
+
+_LOGGER=logging.getLogger(__name__)
+
+# directories modified this recently (in ns) are not cached, because on
+# filesystems with coarse mtimes a file added in the same second as the
+# listing would not change the directory's mtime:
+SETTLE=5*10**9
+
+# seconds to wait for another process's lock on the database (e.g. a
+# concurrent workflow generation), instead of sqlite's default 5:
+TIMEOUT=120
+
+class DirIndex():
+  '''
+  Persistent index of regex-matched files per directory, keyed by mtime.
+  Directories are stored by absolute path, and files and subdirectories by
+  basename, so relative inputs are valid from any working directory.
+  Directories that fail to list, or that disappeared from a listing of
+  their parent, are evicted along with everything below them.
+  '''
+
+  def __init__(self,path,regexes,rebuild=False):
+    if isinstance(regexes,str):
+      regexes=[regexes]
+    self.path=path
+    self.regexes=list(regexes)
+    self.patterns=[re.compile(x) for x in self.regexes]
+    # entries are only valid for the same, ordered list of regexes:
+    self.regex='\n'.join(self.regexes)
+    self.dirs={}
+    self.updates={}
+    self.hits=0
+    self.lock=threading.Lock()
+    d=os.path.dirname(self.path)
+    if len(d)>0 and not os.path.isdir(d):
+      os.makedirs(d)
+    # lookups happen from the scanning threads:
+    self.db=sqlite3.connect(self.path,timeout=TIMEOUT,check_same_thread=False)
+    self.db.execute('CREATE TABLE IF NOT EXISTS dirs (path TEXT, regex TEXT, mtime INTEGER, subdirs TEXT, PRIMARY KEY(path,regex))')
+    self.db.execute('CREATE TABLE IF NOT EXISTS files (dir TEXT, regex TEXT, run INTEGER, file INTEGER, path TEXT)')
+    self.db.execute('CREATE INDEX IF NOT EXISTS files_dir ON files (dir,regex)')
+    if rebuild:
+      _LOGGER.info('Rebuilding directory index '+self.path)
+      self.db.execute('DELETE FROM dirs WHERE regex=?',(self.regex,))
+      self.db.execute('DELETE FROM files WHERE regex=?',(self.regex,))
+      self.db.commit()
+
+  def _load(self,key):
+    # read one directory's entry from the database, None if not indexed:
+    row=self.db.execute('SELECT mtime,subdirs FROM dirs WHERE path=? AND regex=?',(key,self.regex)).fetchone()
+    if row is None:
+      return None
+    files=[os.path.basename(x[0]) for x in self.db.execute('SELECT path FROM files WHERE dir=? AND regex=?',(key,self.regex))]
+    return (row[0],files,[os.path.basename(x) for x in row[1].split('\n') if len(x)>0])
+
+  def get(self,dirName,mtime):
+    # return (files,subdirs) if the directory is unchanged, else None:
+    key=os.path.abspath(dirName)
+    with self.lock:
+      if key not in self.dirs:
+        self.dirs[key]=self._load(key)
+      x=self.dirs[key]
+      if x is None or x[0]!=mtime:
+        return None
+      self.hits+=1
+    return [os.path.join(dirName,f) for f in x[1]],[os.path.join(dirName,d) for d in x[2]]
+
+  def put(self,dirName,mtime,files,dirs,listed=None):
+    # listed is when the directory was listed, in ns since the epoch:
+    if listed is None:
+      listed=time.time_ns()
+    if listed-mtime<SETTLE:
+      return
+    with self.lock:
+      self.updates[os.path.abspath(dirName)]=(mtime,list(files),[os.path.basename(d) for d in dirs])
+
+  def evict(self,dirName):
+    # forget a directory, e.g. one that no longer exists, and its subtree:
+    with self.lock:
+      self.updates[os.path.abspath(dirName)]=None
+
+  def _delete(self,key):
+    # remove a directory and everything below it from the database:
+    prefix=key.rstrip('/')+'/'
+    for table,column in [('dirs','path'),('files','dir')]:
+      self.db.execute('DELETE FROM %s WHERE regex=? AND (%s=? OR substr(%s,1,?)=?)'%(table,column,column),
+          (self.regex,key,len(prefix),prefix))
+
+  def getRunFileTuples(self,files):
+    for path in files:
+      for pattern in self.patterns:
+        m=pattern.match(path)
+        if m is not None:
+          yield (int(m.group(1)),int(m.group(2)),path)
+          break
+
+  def commit(self):
+    if self.hits>0:
+      _LOGGER.info('Reused %d directories from index %s'%(self.hits,self.path))
+      self.hits=0
+    if len(self.updates)==0:
+      return
+    updated,evicted=0,0
+    with self.lock, self.db:
+      for d,x in self.updates.items():
+        if x is None:
+          self._delete(d)
+          evicted+=1
+          continue
+        mtime,files,dirs=x
+        # subdirectories that disappeared since the last listing:
+        old=self.dirs.get(d)
+        if old is None:
+          old=self._load(d)
+        if old is not None:
+          for sub in set(old[2]).difference(dirs):
+            self._delete(os.path.join(d,sub))
+            evicted+=1
+        self.db.execute('DELETE FROM files WHERE dir=? AND regex=?',(d,self.regex))
+        self.db.execute('INSERT OR REPLACE INTO dirs VALUES (?,?,?,?)',(d,self.regex,mtime,'\n'.join(dirs)))
+        self.db.executemany('INSERT INTO files VALUES (?,?,?,?,?)',
+            [(d,self.regex,r,f,os.path.basename(p)) for r,f,p in self.getRunFileTuples(files)])
+        updated+=1
+      # entries are reloaded lazily from the database:
+      self.dirs={}
+    if updated>0:
+      _LOGGER.info('Updated %d directories in index %s'%(updated,self.path))
+    if evicted>0:
+      _LOGGER.info('Evicted %d directories from index %s'%(evicted,self.path))
+    self.updates={}
+
+  def close(self):
+    self.commit()
+    self.db.close()
+
@@ -1,5 +1,11 @@
 import os,gzip
 
+def openText(path):
+  # read text, transparently decompressing if gzipped:
+  if path.endswith('.gz'):
+    return gzip.open(path, 'rt', errors='replace')
+  return open(path, 'r')
+
 def head(path, max_lines=0):
   if path.endswith('.gz'):
     f = gzip.open(path, errors='replace')
@@ -4,20 +4,158 @@ import hashlib
 import zlib
 import logging
 
+from ChecksumCache import ChecksumCache
+
 _LOGGER = logging.getLogger(__name__)
 
 if sys.version_info < (3,0):
   _LOGGER.critical('Requires python > 3')
   sys.exit(1)
 
-# should optimize checksums for large files, meanwhile:
-MAX_FILE_SIZE = 5e9
+# read size for checksums, memory use is constant at this:
+CHUNK_SIZE = 16*1024*1024
+
+# where tape stubs and cached files live (overridable, e.g. for synthetic trees):
+MSS = '/mss/'
+CACHE = '/cache/'
+
+# optional persistent checksums, consulted by CachedFile:
+_CHECKSUMCACHE = None
+
+def setChecksumCache(path):
+  global _CHECKSUMCACHE
+  if _CHECKSUMCACHE is not None:
+    _CHECKSUMCACHE.close()
+  _CHECKSUMCACHE = None if path is None else ChecksumCache(path)
+
+def getChecksumCache():
+  return _CHECKSUMCACHE
+
+def popChecksums():
+  ''' checksums computed in a worker process, for its parent to cache '''
+  if _CHECKSUMCACHE is None:
+    return []
+  return _CHECKSUMCACHE.popPending()
+
+def checksum(path, crc32=True, md5=True, chunkSize=CHUNK_SIZE):
+  ''' (md5,crc32) hex strings of a file, in one pass with a reusable buffer '''
+  m = hashlib.md5() if md5 else None
+  c = 0
+  buf = bytearray(chunkSize)
+  view = memoryview(buf)
+  with open(path, 'rb', buffering=0) as f:
+    while True:
+      n = f.readinto(buf)
+      if not n:
+        break
+      chunk = view[:n]
+      if md5:
+        m.update(chunk)
+      if crc32:
+        c = zlib.crc32(chunk, c)
+  return (str(m.hexdigest()) if md5 else None, '%x' % c if crc32 else None)
+
+# optional StubIndex, consulted instead of reading stubs:
+_STUBINDEX = None
+
+def setStubIndex(index):
+  global _STUBINDEX
+  _STUBINDEX = index
+
+def getStubIndex():
+  return _STUBINDEX
+
+def readStub(path):
+  ''' dict of a stub's key=value lines '''
+  stub = {}
+  with open(path,'r') as f:
+    for line in f:
+      if line.find('=') < 0:
+        continue
+      key,val = line.strip().split('=',1)
+      stub[key] = val
+  return stub
+
+def getFileBytes(path):
+  ''' size of a file, from its stub if on /mss, else None if nonexistent '''
+  if _STUBINDEX is not None and path in _STUBINDEX:
+    return _STUBINDEX.getFileBytes(path)
+  if os.path.isfile(path):
+    if path.startswith(MSS):
+      with open(path,'r') as f:
+        for line in f:
+          cols=line.strip().split('=')
+          if len(cols)==2 and cols[0]=='size':
+            return int(cols[1])
+    else:
+      return os.path.getsize(path)
+  return None
+
+def getStubPath(path):
+  ''' the tape stub corresponding to a /cache path '''
+  if not path.startswith(CACHE):
+    raise ValueError('File must start with '+CACHE+':  '+path)
+  return MSS + path[len(CACHE):]
+
+def _hasStub(path):
+  if _STUBINDEX is not None and path in _STUBINDEX:
+    return True
+  return os.path.isfile(path)
+
+def verifyCachedFile(path, crc32=False, md5=False):
+  ''' compare a /cache file to its tape stub:  ok, mismatch, nostub, or error '''
+  try:
+    stub = getStubPath(path)
+    if not _hasStub(stub):
+      return 'nostub'
+    if CachedFile(path, crc32=crc32, md5=md5) == TapeStub(stub):
+      return 'ok'
+    return 'mismatch'
+  except (ValueError, OSError) as e:
+    _LOGGER.error('Failed to verify '+path+':  '+str(e))
+    return 'error'
+
+def verifyCachedFileTiered(path, sample=False):
+  ''' compare a /cache file to its tape stub in tiers, returning (status,tier):
+  1. size, for every file
+  2. crc32, if sampled or the cached file was modified after the stub was written
+  3. md5, only if crc32 disagrees or the stub has no crc32
+  Status is 'nochecksum' if a checksum was needed but the stub has none.
+  The tier is None for nochecksum, nostub and error, which verified nothing. '''
+  try:
+    stub = getStubPath(path)
+    if not _hasStub(stub):
+      return 'nostub',None
+    tape = TapeStub(stub)
+    cache = CachedFile(path)
+    if cache != tape:
+      return 'mismatch',1
+    if not sample and cache.mtime <= tape.mtime:
+      return 'ok',1
+    if tape.crc32 is not None:
+      cache = CachedFile(path, crc32=True)
+      if cache == tape:
+        return 'ok',2
+    if tape.md5 is None:
+      if tape.crc32 is None:
+        return 'nochecksum',None
+      return 'mismatch',2
+    cache = CachedFile(path, md5=True)
+    if cache == tape:
+      if tape.crc32 is not None:
+        _LOGGER.warning('crc32 disagrees but md5 agrees:  '+path)
+      return 'ok',3
+    return 'mismatch',3
+  except (ValueError, OSError) as e:
+    _LOGGER.error('Failed to verify '+path+':  '+str(e))
+    return 'error',None
 
 class TapeFile():
 
   def __init__(self, path):
 
     self.path = path
+    self.mtime = None
     self.size = None
     self.crc32 = None
     self.md5 = None
@@ -45,33 +183,39 @@ class TapeStub(TapeFile):
 
   def __init__(self, path):
 
-    TapeFile.__init__(self, path)
-
-    self.tape = None
-    self.index = None
-
-    if not path.startswith('/mss/'):
-      raise ValueError('File must start with /mss/:  '+path)
-
-    with open(path,'r') as f:
-      for line in f.readlines():
-        key,val = line.strip().split('=')
-        if key == 'size':
-          self.size = int(val)
-        elif key == 'md5':
-          self.md5 = val
-        elif key == 'crc32':
-          self.crc32 = val
-        elif key == 'volser':
-          self.tape = val
-        elif key == 'bitfileIndex':
-          self.index = val
+    if not path.startswith(MSS):
+      raise ValueError('File must start with '+MSS+':  '+path)
+
+    # use the stub index if it has this file, else read the stub:
+    stub = None if _STUBINDEX is None else _STUBINDEX.getStub(path)
+
+    if stub is None:
+      TapeFile.__init__(self, path)
+      stub = readStub(path)
+      # stubs are written when the file goes to tape:
+      self.mtime = os.stat(path).st_mtime
+    else:
+      self.path = path
+      self.size = None
+      self.crc32 = None
+      self.md5 = None
+      self.mtime = _STUBINDEX.getMtime(path)
+
+    self.tape = stub.get('volser')
+    self.index = stub.get('bitfileIndex')
+    self.md5 = stub.get('md5')
+    self.crc32 = stub.get('crc32')
+    if 'size' in stub:
+      self.size = int(stub['size'])
 
 class PositionedTapeStub(TapeStub):
   ''' for sorting by position on tape '''
 
   def __init__(self, path):
     TapeStub.__init__(self, path)
+    self.position = None
+    if self.index is not None:
+      self.position = int(self.index)
 
   def __eq__(self, other):
     return self.tape==other.tape and self.position==other.position
@@ -83,8 +227,7 @@ class PositionedTapeStub(TapeStub):
       return False
     if self.position < other.position:
       return True
-    if self.position > other.position:
-      return False
+    return False
 
   def __gt__(self, other):
     return not self == other and not self < other
@@ -96,27 +239,29 @@ class CachedFile(TapeFile):
 
     TapeFile.__init__(self, path)
 
-    if not self.path.startswith('/cache/'):
-      raise ValueError('File must start with /cache/:  '+path)
+    if not self.path.startswith(CACHE):
+      raise ValueError('File must start with '+CACHE+':  '+path)
 
-    self.size = os.stat(self.path).st_size
+    st = os.stat(self.path)
+    self.size = st.st_size
+    self.mtime = st.st_mtime
 
     if md5 or crc32:
-      if self.size > MAX_FILE_SIZE:
-        raise ValueError('/cache file is too large to checksum:  '+self.path)
-
-    if md5:
-      with open(self.path,'rb') as f:
-        x = hashlib.md5()
-        x.update(f.read())
-        self.md5 = str(x.hexdigest())
-
-    if crc32:
-      x = 0
-      with open(self.path,'rb') as f:
-        for line in f.readlines():
-          x = zlib.crc32(line, x)
-      self.crc32 = '%x' % x
+      if _CHECKSUMCACHE is not None:
+        self.md5, self.crc32 = _CHECKSUMCACHE.get(self.path, st)
+      # only read the file for checksums not already cached:
+      needmd5 = md5 and self.md5 is None
+      needcrc32 = crc32 and self.crc32 is None
+      if needmd5 or needcrc32:
+        m, c = checksum(self.path, crc32=needcrc32, md5=needmd5)
+        self.md5 = m if needmd5 else self.md5
+        self.crc32 = c if needcrc32 else self.crc32
+        if _CHECKSUMCACHE is not None:
+          _CHECKSUMCACHE.put(self.path, st, m, c)
+      if not md5:
+        self.md5 = None
+      if not crc32:
+        self.crc32 = None
 
 if __name__ == '__main__':
 
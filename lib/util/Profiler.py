@@ -0,0 +1,110 @@
+import sys,time,json,logging,functools,contextlib,collections
+
+_LOGGER=logging.getLogger(__name__)
+
+class Profiler():
+  '''
+  Wall-clock time of named stages, plus call counts and cumulative time of
+  instrumented functions.  Function times are inclusive, and recursive or
+  nested calls of the same function are only timed at the outermost level.
+  Optionally runs cProfile over everything in between start() and stop().
+  '''
+
+  def __init__(self,cprofile=None):
+    self.stages=collections.OrderedDict()
+    self.calls=collections.OrderedDict()
+    self.cprofilePath=cprofile
+    self.cprofile=None
+    self.patched=[]
+    self.started=None
+    self.elapsed=0
+
+  def start(self):
+    self.started=time.time()
+    if self.cprofilePath is not None:
+      import cProfile
+      self.cprofile=cProfile.Profile()
+      self.cprofile.enable()
+
+  def stop(self):
+    if self.cprofile is not None:
+      self.cprofile.disable()
+      self.cprofile.dump_stats(self.cprofilePath)
+      _LOGGER.info('Wrote cProfile statistics to '+self.cprofilePath)
+      self.cprofile=None
+    if self.started is not None:
+      self.elapsed=time.time()-self.started
+      self.started=None
+    self.restore()
+
+  @contextlib.contextmanager
+  def stage(self,name):
+    if name not in self.stages:
+      self.stages[name]=[0,0.0]
+    start=time.time()
+    try:
+      yield
+    finally:
+      self.stages[name][0]+=1
+      self.stages[name][1]+=time.time()-start
+
+  def instrument(self,owner,attr,label=None):
+    '''
+    Replace owner.attr, a module-level function or a class method, with a
+    wrapper that counts calls and time.  Callers must look it up through
+    the module or class at call time for it to be counted.
+    '''
+    if label is None:
+      label=owner.__name__+'.'+attr
+    func=owner.__dict__[attr]
+    if label not in self.calls:
+      self.calls[label]=[0,0.0]
+    entry=self.calls[label]
+    depth=[0]
+    @functools.wraps(func)
+    def wrapper(*args,**kwargs):
+      depth[0]+=1
+      start=time.time()
+      try:
+        return func(*args,**kwargs)
+      finally:
+        depth[0]-=1
+        entry[0]+=1
+        if depth[0]==0:
+          entry[1]+=time.time()-start
+    setattr(owner,attr,wrapper)
+    self.patched.append((owner,attr,func))
+
+  def restore(self):
+    while len(self.patched)>0:
+      owner,attr,func=self.patched.pop()
+      setattr(owner,attr,func)
+
+  def getReport(self):
+    r=collections.OrderedDict()
+    r['argv']=list(sys.argv)
+    r['seconds']=round(self.elapsed,6)
+    r['stages']=collections.OrderedDict()
+    for k,(n,t) in self.stages.items():
+      r['stages'][k]={'calls':n,'seconds':round(t,6)}
+    r['functions']=collections.OrderedDict()
+    for k,(n,t) in self.calls.items():
+      r['functions'][k]={'calls':n,'seconds':round(t,6)}
+    return r
+
+  def writeJson(self,path):
+    with open(path,'w') as f:
+      json.dump(self.getReport(),f,indent=2,separators=(',',': '))
+      f.write('\n')
+
+  def getSummary(self):
+    lines=['%-40s %10s %10s %7s'%('stage/function','calls','seconds','%')]
+    total=max(self.elapsed,1e-9)
+    for title,d in [('stage',self.stages),('function',self.calls)]:
+      for k,(n,t) in d.items():
+        if title=='function' and n==0:
+          continue
+        lines.append('%-40s %10d %10.3f %7.1f'%(title+':'+k,n,t,100*t/total))
+    lines.append('%-40s %10s %10.3f'%('total','',self.elapsed))
+    return '\n'.join(lines)
+
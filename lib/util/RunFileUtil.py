@@ -1,4 +1,8 @@
-import os,re,sys,glob,logging,collections
+import os,re,sys,glob,time,array,logging,functools,itertools,collections
+from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
+from DirIndex import DirIndex
+import JLabTape
+import FileUtil
 
 # The first/second group must match the run/file number:
 # (To accomodate merged files, extra file numbers are allowed at the end)
@@ -7,31 +11,271 @@ __FILEREGEX='.*clas[_A-Za-z]*_(\d+)\.evio\.(\d+)'
 # Avoid partial copies, for data auto-copied to cache on its way to tape:
 __VETO='\.part$'
 
+# Run-numbered directories, which can be skipped during discovery:
+__RUNDIRREGEX=re.compile('^(?:[A-Za-z]+_)?(\d{6})$')
+
+# Assumed size of files whose real size is unknown (a 2 GB EVIO file):
+DEFAULT_FILE_BYTES=2e9
+
+# Number of threads for directory discovery (one task per directory):
+__SCANTHREADS=16
+
+# Optional persistent index of directory listings, keyed by mtime:
+__DIRINDEXPATH=None
+__DIRINDEXREBUILD=False
+__DIRINDEX=None
+
 _LOGGER=logging.getLogger(__name__)
 
+def setScanThreads(threads):
+  global __SCANTHREADS
+  if int(threads)<1:
+    raise ValueError('scan threads must be positive: '+str(threads))
+  __SCANTHREADS=int(threads)
+
+def setDirIndex(path,rebuild=False):
+  global __DIRINDEXPATH,__DIRINDEXREBUILD,__DIRINDEX
+  __DIRINDEXPATH=path
+  __DIRINDEXREBUILD=rebuild
+  __DIRINDEX=None
+
+def getDirIndex():
+  # the index is opened lazily, for the file regexes in use at scan time:
+  global __DIRINDEX,__DIRINDEXREBUILD
+  if __DIRINDEXPATH is None:
+    return None
+  if __DIRINDEX is None or __DIRINDEX.regexes!=__MATCHER.regexes:
+    __DIRINDEX=DirIndex(__DIRINDEXPATH,__MATCHER.regexes,__DIRINDEXREBUILD)
+    __DIRINDEXREBUILD=False
+  return __DIRINDEX
+
+class RunFileMatcher():
+  #
+  # Precompiled file regexes, tried in order, with the parsed run/file
+  # numbers cached per path.  The returned dicts are shared, don't modify.
+  #
+  # The cache is bounded (least-recently used), so the repeated parsing
+  # of a file while building its jobs is free, without keeping every
+  # path of a million-file catalog alive.
+  #
+  def __init__(self,regexes,veto=None,cacheSize=2**16):
+    if isinstance(regexes,str):
+      regexes=[regexes]
+    self.regexes=list(regexes)
+    self.patterns=[re.compile(x) for x in self.regexes]
+    self.veto=None
+    if veto is not None:
+      self.veto=re.compile(veto)
+    self.match=functools.lru_cache(maxsize=cacheSize)(self._parse)
+
+  def search(self,fileName):
+    # the first regex match object, or None:
+    for pattern in self.patterns:
+      mm=pattern.match(fileName)
+      if mm is not None:
+        return mm
+    return None
+
+  def _parse(self,fileName):
+    mm=self.search(fileName)
+    if mm is None:
+      _LOGGER.debug('Failed to match regex for run/file number:  '+fileName)
+      return None
+    if self.veto is not None and self.veto.search(fileName) is not None:
+      _LOGGER.warning('Vetoing partial file:  '+fileName)
+      return None
+    return {'run':int(mm.group(1)),'file':int(mm.group(2))}
+
+  def clearCache(self):
+    self.match.cache_clear()
+
+__MATCHER=RunFileMatcher(__FILEREGEX,__VETO)
+
 def setFileRegex(regex):
-  global __FILEREGEX
-  _LOGGER.info('Changing file regex to '+regex+'. Checking for compilation ...')
-  re.compile(regex)
-  __FILEREGEX=regex
+  # a regex, or an ordered list of them where the first match wins:
+  global __FILEREGEX,__MATCHER
+  if isinstance(regex,str):
+    regex=[regex]
+  for x in regex:
+    _LOGGER.info('Changing file regex to '+x+'. Checking for compilation ...')
+  __MATCHER=RunFileMatcher(regex,__VETO)
+  if len(regex)==1:
+    __FILEREGEX=regex[0]
+  else:
+    __FILEREGEX=list(regex)
 
 def getFileRegex():
   return __FILEREGEX
 
+def getMatcher():
+  return __MATCHER
+
 def getRunFileNumber(fileName):
-  mm = re.match(__FILEREGEX,fileName)
-  vv = re.match(__VETO,fileName)
+  return __MATCHER.match(fileName)
+
+def _runDirNumber(dirName):
+  # the run number if it's a run-numbered directory, e.g. 006501 or clas_006501:
+  mm=__RUNDIRREGEX.match(os.path.basename(dirName))
   if mm is None:
-    _LOGGER.debug('Failed to match regex for run/file number:  '+fileName)
-    return None
-  if vv is not None:
-    _LOGGER.warning('Vetoing partial file:  '+fileName)
     return None
-  runno=int(mm.group(1))
-  fileno=int(mm.group(2))
-  return {'run':runno,'file':fileno}
+  return int(mm.group(1))
+
+def _keepRuns(files,matcher,runs):
+  # only files whose run number is in runs:
+  kept=[]
+  for f in files:
+    mm=matcher.search(f)
+    if mm is not None and int(mm.group(1)) in runs:
+      kept.append(f)
+  return kept
+
+def _scanOne(dirName,matcher,index=None,runs=None):
+  # List one directory, returning regex-matched files and subdirectories,
+  # its mtime and listing time if it had to be listed because the index is
+  # stale, and the files whose run number is in runs:
+  files,dirs,stamp=[],[],None
+  try:
+    cached=None
+    if index is not None:
+      mtime=os.stat(dirName).st_mtime_ns
+      cached=index.get(dirName,mtime)
+      if cached is None:
+        stamp=(mtime,time.time_ns())
+    if cached is not None:
+      files,dirs=cached
+    else:
+      with os.scandir(dirName) as it:
+        for entry in it:
+          if entry.is_dir():
+            # like os.walk, do not descend into symlinked directories:
+            if not entry.is_symlink():
+              dirs.append(entry.path)
+          elif not entry.name.startswith('.'):
+            if matcher.search(entry.path) is not None:
+              files.append(entry.path)
+  except OSError as e:
+    _LOGGER.warning('Failed to list directory '+dirName+': '+str(e))
+    stamp=None
+    if index is not None:
+      index.evict(dirName)
+  if runs is None:
+    return files,dirs,stamp,files
+  return files,dirs,stamp,_keepRuns(files,matcher,runs)
+
+def scanDir(dirName,threads=None,runs=None):
+  # Recursively find files matching the file regex, listing directories
+  # with os.scandir in a thread pool, one task per directory.  If a
+  # directory index is enabled, only directories whose mtime changed
+  # are listed again.  If runs is given, only files from those runs are
+  # returned, and run-numbered subdirectories of other runs are skipped:
+  if threads is None:
+    threads=__SCANTHREADS
+  if runs is not None:
+    runs=set(runs)
+  matcher=__MATCHER
+  index=getDirIndex()
+  found=[]
+  pruned=0
+  with ThreadPoolExecutor(max_workers=threads) as pool:
+    pending={pool.submit(_scanOne,dirName,matcher,index,runs):dirName}
+    while len(pending)>0:
+      done,_=wait(pending,return_when=FIRST_COMPLETED)
+      for future in done:
+        files,dirs,stamp,kept=future.result()
+        if index is not None and stamp is not None:
+          index.put(pending[future],stamp[0],files,dirs,stamp[1])
+        del pending[future]
+        found.extend(kept)
+        for d in dirs:
+          if runs is not None:
+            run=_runDirNumber(d)
+            if run is not None and run not in runs:
+              pruned+=1
+              continue
+          pending[pool.submit(_scanOne,d,matcher,index,runs)]=d
+  if index is not None:
+    index.commit()
+  if pruned>0:
+    _LOGGER.info('Skipped %d directories of unrequested runs in %s'%(pruned,dirName))
+  return found
+
+def getFilesBytes(fileNames,threads=None):
+  # sizes of many files, from /mss stubs or disk, read in parallel:
+  if threads is None:
+    threads=__SCANTHREADS
+  with ThreadPoolExecutor(max_workers=threads) as pool:
+    return list(pool.map(JLabTape.getFileBytes,fileNames))
+
+# sort key for files whose tape position is unknown, after all others:
+_NOTAPE=(1,'',0)
+
+def _getTapePosition(fileName):
+  try:
+    stub=JLabTape.PositionedTapeStub(fileName)
+  except (ValueError,OSError):
+    return _NOTAPE
+  if stub.tape is None or stub.position is None:
+    return _NOTAPE
+  return (0,stub.tape,stub.position)
+
+def getTapePositions(fileNames,threads=None):
+  # (tape,position) sort keys of many /mss stubs, read in parallel:
+  if threads is None:
+    threads=__SCANTHREADS
+  with ThreadPoolExecutor(max_workers=threads) as pool:
+    return list(pool.map(_getTapePosition,fileNames))
+
+def iterChunks(items,maxFiles=0,maxBytes=0,sizes=None,defaultBytes=None):
+  # Yield consecutive chunks of at most maxFiles items and, if maxBytes is
+  # positive, at most maxBytes, with at least one item per chunk.  Items
+  # with unknown size count as defaultBytes:
+  if defaultBytes is None:
+    defaultBytes=DEFAULT_FILE_BYTES
+  if sizes is None:
+    sizes=itertools.repeat(None)
+  chunk,total=[],0
+  for item,size in zip(items,sizes):
+    if size is None:
+      size=defaultBytes
+    if len(chunk)>0:
+      if (maxBytes>0 and total+size>maxBytes) or (maxFiles>0 and len(chunk)>=maxFiles):
+        yield chunk
+        chunk,total=[],0
+    chunk.append(item)
+    total+=size
+  if len(chunk)>0:
+    yield chunk
+
+def packBytes(fileNames,sizes,maxBytes,maxFiles=0,defaultBytes=None):
+  # Split files into consecutive groups of at most maxBytes, and at most
+  # maxFiles if that's positive, with at least one file per group:
+  return list(iterChunks(fileNames,maxFiles,maxBytes,sizes,defaultBytes))
+
+def isFileList(path):
+  # use suffix to assume it's a file list (ugh):
+  for x in ['.txt','.list']:
+    if path.endswith(x) or path.endswith(x+'.gz'):
+      return True
+  return False
+
+def readFileList(path):
+  # Stream the first column of each non-empty line of a (possibly
+  # gzipped) file list, without reading it all into memory:
+  start=time.time()
+  nlines=0
+  with FileUtil.openText(path) as f:
+    for line in f:
+      nlines+=1
+      cols=line.split()
+      if len(cols)>0:
+        yield cols[0]
+  dt=max(time.time()-start,1e-6)
+  _LOGGER.info('Read %d lines from %s in %.1f s (%.0f lines/s)'%(nlines,path,dt,nlines/dt))
 
 class RunFile:
+  # No per-instance __dict__, and the directory part of the path is
+  # interned, so that large catalogs stay compact:
+  __slots__=('dirName','baseName','runNumber','fileNumber')
   def __init__(self,fileName):
     self.fileName=None
     self.runNumber=None
@@ -44,6 +288,19 @@ class RunFile:
     if not rf is None:
       self.fileNumber=rf['file']
       self.runNumber=rf['run']
+  @property
+  def fileName(self):
+    if self.dirName is None:
+      return self.baseName
+    return self.dirName+self.baseName
+  @fileName.setter
+  def fileName(self,fileName):
+    if fileName is None:
+      self.dirName,self.baseName=None,None
+    else:
+      ii=fileName.rfind('/')+1
+      self.dirName=sys.intern(fileName[:ii])
+      self.baseName=fileName[ii:]
   def __eq__(self,other):
     if not type(other) is type(self): raise TypeError('')
     if self.runNumber != other.runNumber: return False
@@ -71,7 +328,7 @@ class RunFile:
 class TapeRunFile(RunFile):
   def __init__(self, path):
     RunFile.__init__(self, path)
-    self.stub = PositionedTapeStub(path)
+    self.stub = JLabTape.PositionedTapeStub(path)
   def __lt__(self, other):
     if not type(other) is type(self): raise TypeError('')
     if self.runNumber < other.runNumber: return True
@@ -79,11 +336,31 @@ class TapeRunFile(RunFile):
     if self.stub < other.stub: return True
     return False
 
-class RunFileGroup(list):
-
+class RunFileGroup():
+  #
+  # All the files from one run, sorted by file number.
+  #
+  # Files are stored in parallel columns (file number, index into the
+  # run's interned directory prefixes, basename), rather than as one
+  # RunFile object per file, and RunFiles are only created on access.
+  #
   def __init__(self):
-    list.__init__(self)
     self.runNumber=None
+    self.fileNumbers=array.array('q')
+    self.dirIndices=array.array('i')
+    self.baseNames=[]
+    self.dirNames=[]
+    self._dirIndex={}
+    # out-of-order additions are sorted once, on the next read:
+    self.ordered=True
+
+  def __len__(self):
+    return len(self.fileNumbers)
+
+  def _duplicate(self,ii):
+    _LOGGER.critical('Found duplicate run/file numbers in run %d: %s and %s'%\
+        (self.runNumber,self._getFileName(ii-1),self._getFileName(ii)))
+    sys.exit()
 
   def add(self,rf):
     if not isinstance(rf,RunFile):
@@ -92,29 +369,73 @@ class RunFileGroup(list):
       return
     elif self.runNumber is None:
       self.runNumber = rf.runNumber
-      self.append(rf)
     elif self.runNumber != rf.runNumber:
       _LOGGER.critical('Run number mismatch: '+str(self.runNumber)+'/'+str(rf.runNumber))
       sys.exit()
-    elif rf in self:
-      _LOGGER.critical('Found duplicate run/file numbers: '+str(rf))
-      sys.exit()
-    else:
-      inserted=False
-      for ii in range(len(self)):
-        if rf < self[ii]:
-          self.insert(ii,rf)
-          inserted=True
-          break
-      if not inserted:
-        self.append(rf)
+    elif self.ordered and rf.fileNumber <= self.fileNumbers[-1]:
+      if rf.fileNumber == self.fileNumbers[-1]:
+        _LOGGER.critical('Found duplicate run/file numbers: '+str(rf))
+        sys.exit()
+      self.ordered=False
+    if rf.dirName not in self._dirIndex:
+      self._dirIndex[rf.dirName]=len(self.dirNames)
+      self.dirNames.append(rf.dirName)
+    self.fileNumbers.append(rf.fileNumber)
+    self.dirIndices.append(self._dirIndex[rf.dirName])
+    self.baseNames.append(rf.baseName)
+
+  def _order(self):
+    # stable sort of all columns by file number, then any
+    # duplicates are adjacent:
+    if not self.ordered:
+      order=sorted(range(len(self)),key=self.fileNumbers.__getitem__)
+      self.fileNumbers=array.array('q',[self.fileNumbers[ii] for ii in order])
+      self.dirIndices=array.array('i',[self.dirIndices[ii] for ii in order])
+      self.baseNames=[self.baseNames[ii] for ii in order]
+      self.ordered=True
+      for ii in range(1,len(self)):
+        if self.fileNumbers[ii]==self.fileNumbers[ii-1]:
+          self._duplicate(ii)
+
+  def _getFileName(self,ii):
+    if self.dirNames[self.dirIndices[ii]] is None:
+      return self.baseNames[ii]
+    return self.dirNames[self.dirIndices[ii]]+self.baseNames[ii]
+
+  def _getRunFile(self,ii):
+    rf=RunFile.__new__(RunFile)
+    rf.dirName=self.dirNames[self.dirIndices[ii]]
+    rf.baseName=self.baseNames[ii]
+    rf.runNumber=self.runNumber
+    rf.fileNumber=self.fileNumbers[ii]
+    return rf
+
+  def getFileNames(self):
+    self._order()
+    return [self._getFileName(ii) for ii in range(len(self))]
+
+  def __iter__(self):
+    self._order()
+    for ii in range(len(self)):
+      yield self._getRunFile(ii)
+
+  def __getitem__(self,index):
+    self._order()
+    if isinstance(index,slice):
+      return [self._getRunFile(ii) for ii in range(len(self))[index]]
+    if index<0:
+      index+=len(self)
+    if index<0 or index>=len(self):
+      raise IndexError('RunFileGroup index out of range')
+    return self._getRunFile(index)
 
   def addFile(self,fileName):
     self.add(RunFile(fileName))
 
   def __str__(self):
+    self._order()
     xx=str(self.runNumber)+'('
-    xx += ','.join([str(yy.fileNumber) for yy in self])
+    xx += ','.join([str(yy) for yy in self.fileNumbers])
     xx+=')'
     return xx
 
@@ -126,6 +447,8 @@ class RunFileGroups(collections.OrderedDict):
 
   def __init__(self):
     self.groupSize=0
+    self.groupBytes=0
+    self.tapeOrder=False
     collections.OrderedDict.__init__(self)
 
   def addRun(self,run):
@@ -140,26 +463,40 @@ class RunFileGroups(collections.OrderedDict):
   def setGroupSize(self,groupSize):
     self.groupSize=int(groupSize)
 
+  def setGroupBytes(self,groupBytes):
+    self.groupBytes=int(groupBytes)
+
+  def setTapeOrder(self,tapeOrder):
+    self.tapeOrder=bool(tapeOrder)
+
   def addFile(self,fileName):
     rf=RunFile(fileName)
     # ignore if run# is not registered:
     if rf is None or not rf.runNumber in self:
       return
-    self[rf.runNumber].addFile(fileName)
+    self[rf.runNumber].add(rf)
 
   def addDir(self,dirName):
     _LOGGER.info('Adding directory '+dirName+' ...')
-    for dirpath,dirnames,filenames in os.walk(dirName):
-      for filename in filenames:
-        if not filename.startswith('.'):
-          self.addFile(dirpath+'/'+filename)
+    for filename in scanDir(dirName,runs=self.keys()):
+      self.addFile(filename)
+
+  def checkFiles(self):
+    # sort any out-of-order additions now, so duplicates are
+    # reported during input discovery rather than on first use:
+    for rfg in self.values():
+      rfg._order()
 
   def findFiles(self,data):
+    self._findFiles(data)
+    self.checkFiles()
+
+  def _findFiles(self,data):
 
     # recurse if it's a list:
     if isinstance(data,list):
       for datum in data:
-        self.findFiles(datum)
+        self._findFiles(datum)
 
     # walk if it's a directory:
     elif os.path.isdir(data):
@@ -168,12 +505,12 @@ class RunFileGroups(collections.OrderedDict):
     # file containing a file list if it's a file:
     elif os.path.isfile(data):
       _LOGGER.info('Assuming '+data+' is a file containing a file list.')
-      for x in open(data,'r').readlines():
-        try:
-          self.addFile(x.split()[0])
-        except:
-          _LOGGER.critical('Failed to parse file list from '+data)
-          sys.exit(1)
+      try:
+        for x in readFileList(data):
+          self.addFile(x)
+      except (OSError,UnicodeDecodeError):
+        _LOGGER.critical('Failed to parse file list from '+data)
+        sys.exit(1)
 
     # else assume it's a glob:
     else:
@@ -195,16 +532,28 @@ class RunFileGroups(collections.OrderedDict):
     # Otherwise, each group will be contain all the files
     # from one run.
     #
+    # If groupBytes is greater than 0, then groups will instead
+    # be packed up to that many bytes, using real file sizes
+    # from /mss stubs or disk, and also still limited to
+    # groupSize files if that is greater than 0.
+    #
+    # If tapeOrder is set, files within each run are ordered
+    # by tape and position on tape, and runs by the position
+    # of their first file, to minimize tape mounts and seeks.
+    #
+    runFiles=self._getRunFileNames()
+    if self.groupBytes>0:
+      return self._getByteGroups(runFiles)
     groups=[]
     phaseList=[]
-    for run,rfg in list(self.items()):
+    for fileNames in runFiles:
       # make a new group for the next run:
       if len(phaseList)>0:
         groups.append(phaseList)
       phaseList=[]
       # loop over the files in this run:
-      for rf in rfg:
-        phaseList.append(rf.fileName)
+      for fileName in fileNames:
+        phaseList.append(fileName)
         # make a new group if we're over the size limit:
         if self.groupSize>0 and len(phaseList)>=self.groupSize:
           groups.append(phaseList)
@@ -214,11 +563,30 @@ class RunFileGroups(collections.OrderedDict):
       groups.append(phaseList)
     return groups
 
+  def _getRunFileNames(self):
+    runFiles=[rfg.getFileNames() for rfg in self.values()]
+    if not self.tapeOrder:
+      return runFiles
+    positions=iter(getTapePositions([x for y in runFiles for x in y]))
+    keys=[]
+    for ii,fileNames in enumerate(runFiles):
+      x=sorted(zip([next(positions) for y in fileNames],fileNames),key=lambda z:z[0])
+      runFiles[ii]=[y[1] for y in x]
+      keys.append(x[0][0] if len(x)>0 else _NOTAPE)
+    order=sorted(range(len(runFiles)),key=keys.__getitem__)
+    return [runFiles[ii] for ii in order]
+
+  def _getByteGroups(self,runFiles):
+    groups=[]
+    sizes=iter(getFilesBytes([x for y in runFiles for x in y]))
+    for x in runFiles:
+      groups.extend(packBytes(x,[next(sizes) for y in x],self.groupBytes,self.groupSize))
+    return groups
+
   def getFlatList(self):
     flatList=[]
     for run,rfg in list(self.items()):
-      for rf in rfg:
-        flatList.append(rf.fileName)
+      flatList.extend(rfg.getFileNames())
     return flatList
 
   def getRunList(self,minFileCount=1):
@@ -238,7 +606,7 @@ class RunFileGroups(collections.OrderedDict):
       val.show()
 
   def getFileCount(self):
-    return len(self.getFlatList())
+    return sum([len(rfg) for rfg in self.values()])
 
 
 # recursive function to generate a run list:
@@ -251,21 +619,26 @@ def getRunList(data):
     for datum in data:
       runs.extend(getRunList(datum))
 
-  # it's a directory, walk it:
+  # it's a directory, scan it (only regex-matched files are returned):
   elif os.path.isdir(data):
-    for dirpath,dirnames,filenames in os.walk(data):
-      for filename in filenames:
-        # recurse with the filename:
-        runs.extend(getRunList(dirpath+'/'+filename))
+    for filename in scanDir(data):
+      rf=RunFile(filename)
+      if rf.runNumber is not None:
+        runs.append(int(rf.runNumber))
 
   # it's a file:
   elif os.path.isfile(data):
 
     # use suffix to assume it's a file list (ugh):
-    if data.endswith('.txt') or data.endswith('.list'):
-      for line in open(data,'r').readlines():
-        # recurse with the line:
-        runs.extend(getRunList(line.strip()))
+    if isFileList(data):
+      for line in readFileList(data):
+        # no need to stat lines that already look like input files:
+        rf=getRunFileNumber(line)
+        if rf is not None:
+          runs.append(rf['run'])
+        # else recurse with the line:
+        else:
+          runs.extend(getRunList(line))
 
     # otherwise, finally, try to extract a run number:
     else:
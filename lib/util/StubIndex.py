@@ -0,0 +1,136 @@
+import os,array,sqlite3,logging
+from concurrent.futures import ThreadPoolExecutor
+
+import JLabTape
+
+_LOGGER=logging.getLogger(__name__)
+
+def _readStub(path):
+  try:
+    return path,JLabTape.readStub(path),os.stat(path).st_mtime
+  except OSError as e:
+    _LOGGER.warning('Ignoring unreadable stub:  '+str(e))
+    return None
+
+def _walkStubs(directory):
+  for root,dirs,files in os.walk(directory):
+    dirs.sort()
+    for f in sorted(files):
+      yield os.path.join(root,f)
+
+class StubIndex():
+  ''' columnar table of /mss tape stubs, loaded in bulk and persistable '''
+
+  def __init__(self):
+    self.paths=[]
+    self.sizes=array.array('q')
+    self.md5s=[]
+    self.crc32s=[]
+    self.volsers=[]
+    self.indices=array.array('q')
+    self.mtimes=array.array('d')
+    self._rows=None
+
+  def __len__(self):
+    return len(self.paths)
+
+  def append(self,path,size,md5,crc32,volser,index,mtime):
+    # unknown sizes and indices are stored as -1:
+    self.paths.append(path)
+    self.sizes.append(-1 if size is None else int(size))
+    self.md5s.append(md5)
+    self.crc32s.append(crc32)
+    self.volsers.append(volser)
+    self.indices.append(-1 if index is None else int(index))
+    self.mtimes.append(mtime)
+    self._rows=None
+
+  def addStubs(self,paths,threads=16):
+    ''' read many stubs in parallel '''
+    n=len(self)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+      for x in pool.map(_readStub,paths):
+        if x is not None:
+          path,stub,mtime=x
+          self.append(path,stub.get('size'),stub.get('md5'),stub.get('crc32'),
+              stub.get('volser'),stub.get('bitfileIndex'),mtime)
+    _LOGGER.info('Read %d tape stubs'%(len(self)-n))
+
+  def addDir(self,directory,threads=16):
+    ''' read all stubs under a directory in parallel '''
+    self.addStubs(_walkStubs(directory),threads)
+
+  def _row(self,path):
+    if self._rows is None:
+      self._rows=dict([(x,i) for i,x in enumerate(self.paths)])
+    return self._rows.get(path)
+
+  def __contains__(self,path):
+    return self._row(path) is not None
+
+  def getStub(self,path):
+    ''' dict of the stub's key/values, as from JLabTape.readStub, else None '''
+    i=self._row(path)
+    if i is None:
+      return None
+    stub={}
+    if self.sizes[i]>=0: stub['size']=str(self.sizes[i])
+    if self.md5s[i] is not None: stub['md5']=self.md5s[i]
+    if self.crc32s[i] is not None: stub['crc32']=self.crc32s[i]
+    if self.volsers[i] is not None: stub['volser']=self.volsers[i]
+    if self.indices[i]>=0: stub['bitfileIndex']=str(self.indices[i])
+    return stub
+
+  def getMtime(self,path):
+    i=self._row(path)
+    return None if i is None else self.mtimes[i]
+
+  def getFileBytes(self,path):
+    i=self._row(path)
+    if i is None or self.sizes[i]<0:
+      return None
+    return self.sizes[i]
+
+  def getTape(self,path):
+    ''' (volser,index) of the tape holding a file, else None '''
+    i=self._row(path)
+    if i is None:
+      return None
+    return self.volsers[i],self.indices[i]
+
+  def getBytes(self,select=None):
+    ''' total bytes of all stubs, or those whose path satisfies select '''
+    if select is None:
+      return sum([x for x in self.sizes if x>0])
+    return sum([x for p,x in zip(self.paths,self.sizes) if x>0 and select(p)])
+
+  def getTapeBytes(self):
+    ''' total bytes per tape '''
+    tapes={}
+    for v,x in zip(self.volsers,self.sizes):
+      if x>0:
+        tapes[v]=tapes.get(v,0)+x
+    return tapes
+
+  def save(self,path):
+    d=os.path.dirname(path)
+    if len(d)>0 and not os.path.isdir(d):
+      os.makedirs(d)
+    db=sqlite3.connect(path)
+    with db:
+      db.execute('DROP TABLE IF EXISTS stubs')
+      db.execute('CREATE TABLE stubs (path TEXT PRIMARY KEY, size INTEGER, md5 TEXT, crc32 TEXT, volser TEXT, idx INTEGER, mtime REAL)')
+      db.execute('CREATE INDEX stubs_volser ON stubs (volser,idx)')
+      db.executemany('INSERT OR REPLACE INTO stubs VALUES (?,?,?,?,?,?,?)',
+          zip(self.paths,self.sizes,self.md5s,self.crc32s,self.volsers,self.indices,self.mtimes))
+    db.close()
+    _LOGGER.info('Saved %d tape stubs to index %s'%(len(self),path))
+
+  def load(self,path):
+    if not os.path.isfile(path):
+      raise ValueError('Stub index does not exist:  '+path)
+    db=sqlite3.connect(path)
+    for row in db.execute('SELECT path,size,md5,crc32,volser,idx,mtime FROM stubs ORDER BY volser,idx'):
+      self.append(*row)
+    db.close()
+    _LOGGER.info('Loaded %d tape stubs from index %s'%(len(self),path))
@@ -0,0 +1,89 @@
+import os
+import json
+import logging
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import JLabTape
+
+_LOGGER = logging.getLogger(__name__)
+
+# tape name for stubs without a volser, staged last:
+UNKNOWN_TAPE = 'unknown'
+
+def _readStub(path):
+  try:
+    return JLabTape.TapeStub(path)
+  except (ValueError, OSError) as e:
+    _LOGGER.warning('Ignoring unreadable stub:  '+str(e))
+    return None
+
+class StagingPlan():
+  ''' /mss files grouped by tape and ordered by position on tape, for jcache '''
+
+  def __init__(self, paths, threads=16):
+    self.tapes = collections.OrderedDict()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+      stubs = [x for x in pool.map(_readStub, paths) if x is not None]
+    tapes = {}
+    for stub in stubs:
+      tape = UNKNOWN_TAPE if stub.tape is None else stub.tape
+      index = -1 if stub.index is None else int(stub.index)
+      tapes.setdefault(tape, []).append((index, stub.path, stub.size))
+    for tape in sorted(tapes, key=lambda x: (x == UNKNOWN_TAPE, x)):
+      self.tapes[tape] = sorted(tapes[tape])
+    _LOGGER.info('Planned staging of %d files from %d tapes'%(len(stubs),len(self.tapes)))
+
+  def getBytes(self, tape=None):
+    if tape is not None:
+      return sum([x[2] for x in self.tapes[tape] if x[2] is not None])
+    return sum([self.getBytes(x) for x in self.tapes])
+
+  def getBatches(self, maxTapes):
+    ''' lists of tapes, at most maxTapes per batch, to be staged one batch at a time '''
+    tapes = list(self.tapes.keys())
+    if maxTapes < 1:
+      return [tapes]
+    return [tapes[i:i+maxTapes] for i in range(0, len(tapes), maxTapes)]
+
+  def getCommands(self, tape, maxFiles=500, days=60):
+    ''' jcache requests for one tape, in order of position on tape '''
+    paths = [x[1] for x in self.tapes[tape]]
+    cmds = []
+    for i in range(0, len(paths), maxFiles):
+      cmds.append('jcache get -D %d %s'%(days, ' '.join(paths[i:i+maxFiles])))
+    return cmds
+
+  def toJson(self, maxTapes, maxFiles=500, days=60):
+    data = collections.OrderedDict()
+    data['files'] = sum([len(x) for x in self.tapes.values()])
+    data['bytes'] = self.getBytes()
+    data['batches'] = []
+    for batch in self.getBatches(maxTapes):
+      tapes = []
+      for tape in batch:
+        x = collections.OrderedDict()
+        x['volser'] = tape
+        x['files'] = len(self.tapes[tape])
+        x['bytes'] = self.getBytes(tape)
+        x['commands'] = self.getCommands(tape, maxFiles, days)
+        tapes.append(x)
+      data['batches'].append(tapes)
+    return json.dumps(data, indent=2, separators=(',',': '))
+
+  def writeScripts(self, directory, maxTapes, maxFiles=500, days=60):
+    ''' one script per batch, to be run after the previous batch is staged '''
+    os.makedirs(directory, exist_ok=True)
+    scripts = []
+    for i, batch in enumerate(self.getBatches(maxTapes)):
+      script = '%s/stage-%.3d.sh'%(directory, i)
+      with open(script, 'w') as f:
+        f.write('#!/bin/bash\n')
+        for tape in batch:
+          f.write('# tape %s:  %d files, %.1f GB\n'%(tape, len(self.tapes[tape]), self.getBytes(tape)/1e9))
+          for cmd in self.getCommands(tape, maxFiles, days):
+            f.write(cmd+'\n')
+      os.chmod(script, 0o755)
+      scripts.append(script)
+    return scripts
+
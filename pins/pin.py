@@ -1,18 +1,75 @@
 #!/usr/bin/env python3
 
-def get_sizes(f):
-    for path in open(f):
-        if path.startswith('/cache'):
-            path = '/mss' + path[6:]
-        import os
-        for root, dirs, files in os.walk(path.strip()):
-            for file in files:
-                for line in open(os.path.join(root, file)):
-                    if line.startswith('size'):
-                        yield int(line.strip().split('=').pop())
-                        break
-
-def crawl(d):
+import os,sys
+sys.path.append(os.path.dirname(os.path.realpath(__file__))+'/../lib/util')
+import JLabTape
+
+def sum_dir(path, cache):
+    # bytes of the stubs directly in a directory, and its subdirectories,
+    # reused from the cache if the directory's mtime is unchanged.  Like
+    # os.walk, a directory that can't be listed is skipped (entry None),
+    # and so is any stub that can't be read:
+    try:
+        mtime = os.stat(path).st_mtime
+        x = cache.get(path)
+        if x is not None and x[0] == mtime:
+            return path, x, False
+        size, dirs = 0, []
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        dirs.append(e.path)
+                    elif e.is_file():
+                        size += JLabTape.getFileBytes(e.path) or 0
+                except (OSError, ValueError):
+                    continue
+    except OSError:
+        return path, None, False
+    return path, [mtime, size, dirs], True
+
+def get_size(f, cache, threads=16):
+    from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
+    size, ndirs, nchanged = 0, 0, 0
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = set()
+        for path in open(f):
+            if path.startswith('/cache'):
+                path = '/mss' + path[6:]
+            if os.path.isdir(path.strip()):
+                pending.add(pool.submit(sum_dir, path.strip(), cache))
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for x in done:
+                path, entry, changed = x.result()
+                if entry is None:
+                    cache.pop(path, None)
+                    continue
+                cache[path] = entry
+                size += entry[1]
+                ndirs += 1
+                nchanged += changed
+                for d in entry[2]:
+                    pending.add(pool.submit(sum_dir, d, cache))
+    return size, ndirs, nchanged
+
+def load_cache(path):
+    import json
+    if os.path.isfile(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_cache(path, cache):
+    import json
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path+'.tmp','w') as f:
+        json.dump(cache, f)
+    os.replace(path+'.tmp', path)
+
+def crawl(d, cache_path, threads=16):
+    import time
+    cache = load_cache(cache_path)
     with open(d+'/README.html','w') as o:
         def write(line):
             o.write(line)
@@ -24,7 +81,11 @@ def crawl(d):
         import glob
         for f in sorted(glob.glob(d+'/*.txt')):
             k = f.split('/').pop().split('.').pop(0)
-            sizes[k] = sum(list(get_sizes(f)))
+            start = time.time()
+            sizes[k], ndirs, nchanged = get_size(f, cache, threads)
+            # save as we go, so an interrupted crawl is not lost:
+            save_cache(cache_path, cache)
+            print('# %s:  %d directories, %d re-summed, %.1f s' % (k.upper(),ndirs,nchanged,time.time()-start), flush=True)
             write('<li>%s:  %.1f TB</li>' % (k.upper(),sizes[k]/1e12))
         write('<li>TOTAL: %.1f TB</li>' % (sum(sizes.values())/1e12))
         write('</ul>')
@@ -52,9 +113,11 @@ if __name__ == '__main__':
     cli.add_argument('-c',help='calculate data volume',action='store_true')
     cli.add_argument('-p',help='issue pin requests',action='store_true')
     cli.add_argument('-i',help='input directory or filename',default=os.path.dirname(os.path.realpath(__file__)))
+    cli.add_argument('-t',help='number of threads for calculating data volume',type=int,default=16)
+    cli.add_argument('--cache',help='cache of per-directory data volume, keyed by mtime',default='~/.clas12-workflow/pin-sizes.json')
     args = cli.parse_args()
     if args.c:
-        crawl(args.i)
+        crawl(args.i, os.path.expanduser(args.cache), args.t)
     if args.p:
         pin(args.i)
 